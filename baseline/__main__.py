@@ -22,16 +22,22 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import difflib
+import io
 import os
 import sys
 from argparse import ArgumentParser
+from fnmatch import fnmatch
 from glob import glob
+from multiprocessing.pool import ThreadPool
+
+from . import _diff, _manifest, _script, _shards
 
 PY2 = sys.version_info.major < 3
 if PY2:  # pragma: no cover
     input = raw_input
 
+scandir = getattr(os, 'scandir', None)
+
 
 DESCRIPTION = """
 Locate scripts with baseline updates within the paths specified and modify 
@@ -41,25 +47,206 @@ changed.)
 """.strip()
 
 
-def locate_updates(paths):
+# directories never searched for update files (unless --no-prune)
+DEFAULT_EXCLUDES = (
+    '.git', '.hg', '.svn', '.tox', '.nox', '.eggs', '*.egg-info', '.venv', 'venv',
+    'node_modules', '__pycache__', '.mypy_cache', '.pytest_cache')
+
+# directories not searched when directly within a search path (unless
+# --no-prune), deeper ones may be test packages
+ROOT_EXCLUDES = ('/build', '/dist')
+
+
+def _read_ignore_file(dirpath):
+    """Read directory exclusion patterns from ``.gitignore`` file.
+
+    Support a subset of the ``.gitignore`` format. Ignore blank lines
+    and comments. Negated patterns (lines starting with ``!``) are not
+    supported, ignore every rule of a file containing one (rather than
+    excluding directories it re-includes).
+
+    :param str dirpath: directory containing ``.gitignore`` file
+    :returns: exclusion rules (directory, pattern)
+    :rtype: list of tuple
+
+    """
+    rules = []
+
+    try:
+        with io.open(os.path.join(dirpath, '.gitignore'), encoding='utf-8') as fh:
+            lines = fh.read().splitlines()
+    except (OSError, IOError, ValueError):
+        lines = []
+
+    for line in lines:
+        pattern = line.strip().rstrip('/')
+        if pattern.startswith('!'):
+            return []
+        if pattern and not pattern.startswith('#'):
+            rules.append((dirpath, pattern))
+
+    return rules
+
+
+def _excluded(path, rules):
+    """Check if directory excluded from search.
+
+    :param str path: directory path
+    :param list rules:
+        exclusion rules (directory pattern is relative to, pattern)
+        where patterns without a slash match the directory name and
+        patterns with a slash (including a leading one) match the path
+        relative to the directory
+    :returns: indication if excluded
+    :rtype: bool
+
+    """
+    name = os.path.basename(path)
+
+    for base, pattern in rules:
+        if '/' in pattern:
+            relpath = os.path.relpath(path, base).replace(os.path.sep, '/')
+            if fnmatch(relpath, pattern.lstrip('/')):
+                return True
+        elif fnmatch(name, pattern):
+            return True
+
+    return False
+
+
+def _scan_dir(dirpath, rules=(), prune=True):
+    """Scan directory for baseline update files and subdirectories.
+
+    :param str dirpath: directory path
+    :param list rules: directory exclusion rules (see ``_excluded()``)
+    :param bool prune: skip virtual environments and honor ``.gitignore``
+    :returns: subdirectory paths, update file paths, exclusion rules
+        for subdirectories
+    :rtype: tuple
+
+    """
+    subdirs = []
+    updates = []
+    names = set()
+
+    try:
+        if scandir is None:  # pragma: no cover
+            for name in os.listdir(dirpath):
+                path = os.path.join(dirpath, name)
+                names.add(name)
+                if os.path.isdir(path):
+                    if not os.path.islink(path):
+                        subdirs.append(path)
+                elif name.endswith('.update'):
+                    updates.append(path)
+        else:
+            for entry in scandir(dirpath):
+                names.add(entry.name)
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif entry.name.endswith('.update'):
+                    updates.append(entry.path)
+    except OSError:
+        pass  # same as os.walk(), ignore directories that can't be read
+
+    if prune:
+        if 'pyvenv.cfg' in names:
+            # virtual environment
+            return [], [], rules
+
+        if '.gitignore' in names:
+            rules = list(rules) + _read_ignore_file(dirpath)
+
+    subdirs = [path for path in subdirs if not _excluded(path, rules)]
+
+    return subdirs, updates, rules
+
+
+def locate_updates(paths, jobs=1, excludes=(), prune=True):
     """Find location of baseline update files.
 
     Recursively walk through `paths` and find baseline
     update files and return their locations.
 
     :param paths: paths to search
-    :returns: relative paths (from CWD) of update files found
+    :param int jobs: number of directories to scan concurrently
+    :param excludes: patterns of additional directories to skip (patterns
+        with a slash are relative to the CWD, others match directory names)
+    :param bool prune: skip directories in ``DEFAULT_EXCLUDES`` (and
+        ``ROOT_EXCLUDES`` of each path), virtual environments, and
+        directories excluded by ``.gitignore`` files
+    :returns: relative paths (from CWD) of update files found (sorted)
     :rtype: list of str
 
     """
+    cwd = os.getcwd()
     updates = []
-    for dirpath in (p for p in paths if os.path.isdir(p)):
-        for path, _dirs, files in os.walk(dirpath):
-            for name in files:
-                if name.endswith('.update'):
-                    updates.append(
-                        os.path.join(os.path.relpath(path, os.getcwd()), name))
-    return updates
+
+    rules = [(cwd, pattern.rstrip('/')) for pattern in excludes]
+    if prune:
+        rules.extend((cwd, pattern) for pattern in DEFAULT_EXCLUDES)
+
+    def scan(args):
+        return _scan_dir(args[0], args[1], prune)
+
+    pool = ThreadPool(jobs) if jobs > 1 else None
+
+    try:
+        pending = [
+            (p, rules + [(p, pattern) for pattern in ROOT_EXCLUDES] if prune else rules)
+            for p in paths if os.path.isdir(p)]
+
+        # scan one directory level at a time (concurrently when using
+        # a pool) until no subdirectories remain
+        while pending:
+            results = (pool.map if pool else map)(scan, pending)
+            pending = []
+            for subdirs, update_paths, subdir_rules in results:
+                pending.extend((path, subdir_rules) for path in subdirs)
+                updates.extend(os.path.relpath(path, cwd) for path in update_paths)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    return sorted(updates)
+
+
+def read_manifest(paths):
+    """Get location of baseline update files from update manifest.
+
+    Read manifest in the current working directory (written when update
+    files are generated) and return the locations within `paths`. The
+    manifest only covers paths within the current working directory,
+    paths outside of it must still be searched.
+
+    :param paths: paths to search
+    :returns: relative paths (from CWD) of update files (sorted) and
+        paths not covered by the manifest (every path when manifest
+        missing or stale)
+    :rtype: tuple
+
+    """
+    cwd = os.getcwd()
+
+    update_filepaths = _manifest.read(cwd)
+
+    if update_filepaths is None:
+        return [], list(paths)
+
+    dirpaths = []
+    uncovered_paths = []
+
+    for path in paths:
+        if os.path.relpath(path, cwd).split(os.path.sep)[0] == os.path.pardir:
+            uncovered_paths.append(path)
+        elif os.path.isdir(path):
+            dirpaths.append(os.path.join(os.path.abspath(path), ''))
+
+    return [
+        os.path.relpath(path, cwd) for path in update_filepaths
+        if any(path.startswith(dirpath) for dirpath in dirpaths)], uncovered_paths
 
 
 def perform_action(script_path, update_path, args):
@@ -72,9 +259,8 @@ def perform_action(script_path, update_path, args):
     """
     if args.movepath:
         script_path = os.path.join(args.movepath, script_path)
-        script_dirpath = os.path.dirname(script_path)
-        if not os.path.isdir(script_dirpath):
-            os.makedirs(script_dirpath)
+        # (directory may be created concurrently with --jobs)
+        _script.makedirs(os.path.dirname(script_path))
 
     if not args.clean:
         with open(update_path) as update:
@@ -92,9 +278,10 @@ def perform_action(script_path, update_path, args):
             print(border)
 
             keepends = True
-            diff_lines = difflib.context_diff(
+            diff_lines = _diff.context_diff(
                 old_content.splitlines(keepends), new_content.splitlines(keepends))
-            print(''.join(diff_lines).rstrip())
+            for line in diff_lines:
+                print(line, end='' if line.endswith('\n') else '\n')
 
             print(title)
             print()
@@ -122,6 +309,7 @@ def perform_action(script_path, update_path, args):
                 pass  # must be windows
 
     os.remove(update_path)
+    _shards.remove(update_path)
 
 
 def main(args=None):
@@ -155,6 +343,28 @@ def main(args=None):
         '--force', action='store_true',
         help='do not prompt (does not apply to --diff')
 
+    parser.add_argument(
+        '-x', '--exclude', action='append', default=[], metavar='PATTERN',
+        help='directory pattern to skip when searching (may be repeated)')
+
+    parser.add_argument(
+        '--no-prune', action='store_true',
+        help='search all directories (except those excluded with --exclude), '
+             'including version control, virtual environment, build, and '
+             '.gitignore excluded directories')
+
+    parser.add_argument(
+        '--manifest', action='store_true',
+        help='use update files listed in the update manifest ({}) of the '
+             'current working directory instead of searching it (update '
+             'files written from other directories are missed)'.format(
+                 _manifest.MANIFEST_NAME))
+
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='number of directories to scan and updates to apply '
+             'concurrently (updates applied one at a time with --diff)')
+
     args = parser.parse_args(args)
 
     paths = args.path or ['.']
@@ -172,7 +382,14 @@ def main(args=None):
             )
             return 1
 
-    update_file_paths = locate_updates(paths)
+    if args.manifest:
+        update_file_paths, search_paths = read_manifest(paths)
+    else:
+        update_file_paths, search_paths = [], paths
+
+    if search_paths:
+        update_file_paths = sorted(set(update_file_paths).union(locate_updates(
+            search_paths, args.jobs, args.exclude, prune=not args.no_prune)))
 
     exitcode = 0
 
@@ -192,14 +409,30 @@ def main(args=None):
                     'move' if args.movepath else 'accept')
                 input(prompt)
 
-            for script_path, update_path in zip(script_paths, update_file_paths):
-                perform_action(script_path, update_path, args)
+            actions = list(zip(script_paths, update_file_paths))
+
+            if args.jobs > 1 and not args.diff:
+                pool = ThreadPool(args.jobs)
+                try:
+                    pool.map(lambda action: perform_action(*action, args=args), actions)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                for script_path, update_path in actions:
+                    perform_action(script_path, update_path, args)
 
         except KeyboardInterrupt:
             print()
             print('Canceled')
             exitcode = 1
 
+        finally:
+            _manifest.prune(os.getcwd())
+
+    # shards left by runs whose update files were since removed
+    _shards.remove_orphans()
+
     return exitcode
 
 
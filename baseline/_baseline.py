@@ -23,12 +23,13 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import atexit
-import difflib
-import inspect
 import os
 import sys
-from warnings import warn
+import time
 
+# (modules only needed to transform strings, print differences, or
+# update scripts are imported when first needed to keep import fast)
+from . import _script
 from ._script import Script
 
 PY2 = sys.version_info.major < 3
@@ -43,6 +44,59 @@ baseclass = type(u"")
 RAW_STRING_SPECIAL_CHARS = ('\n', '"', '\\')
 
 
+def _caller_frame(depth):
+    """Get frame of a caller (without building a record of the entire stack).
+
+    :param int depth: number of frames to go back (1 means the caller of
+        the function that invoked this function)
+    :returns: frame object
+
+    """
+    try:
+        return sys._getframe(depth + 1)
+    except AttributeError:  # pragma: no cover
+        # Python implementation without sys._getframe()
+        try:
+            raise RuntimeError
+        except RuntimeError:
+            frame = sys.exc_info()[2].tb_frame.f_back
+        for _ in range(depth):
+            frame = frame.f_back
+        return frame
+
+
+class _Escapes(dict):
+
+    """Escape sequence for each character (as ``ascii()`` represents it)."""
+
+    def __missing__(self, char):
+        escape = self[char] = ascii(char)[2 if PY2 else 1:-1]
+        return escape
+
+
+_ESCAPES = _Escapes()
+
+# compiled regular expressions that match characters needing escapes
+# (key: special characters, value: compiled regular expression)
+_ESCAPE_REGEXES = {}
+
+
+def _escape_regex(special_chars):
+    try:
+        regex = _ESCAPE_REGEXES[special_chars]
+    except KeyError:
+        import re
+
+        # anything other than printable ASCII and the special characters,
+        # plus backslash unless it is a special character
+        specials = ''.join(re.escape(char) for char in special_chars)
+        pattern = '[^ -~{}]'.format(specials)
+        if '\\' not in special_chars:
+            pattern += r'|\\'
+        regex = _ESCAPE_REGEXES[special_chars] = re.compile(pattern)
+    return regex
+
+
 def multiline_repr(text, special_chars=('\n', '"')):
     """Get string representation for triple quoted context.
 
@@ -62,17 +116,98 @@ def multiline_repr(text, special_chars=('\n', '"')):
     :rtype: str
 
     """
-    try:
-        char = special_chars[0]
-    except IndexError:
+    special_chars = tuple(special_chars)
+
+    if '"' in special_chars or "'" in special_chars or "'" not in text or '"' not in text:
+        # single quotes are never escaped, escape each character on its own
+        text = _escape_regex(special_chars).sub(
+            lambda match: _ESCAPES[match.group()], text)
+
+    elif not special_chars:
         text = ascii(text)[2 if PY2 else 1:-1]
+
     else:
-        text = char.join(
-            multiline_repr(s, special_chars[1:]) for s in text.split(char))
+        import re
+
+        # the representation of text between special characters that contains
+        # both quote styles escapes single quotes, represent each on its own
+        fragments = re.split(
+            '({})'.format('|'.join(re.escape(char) for char in special_chars)), text)
+        fragments[::2] = [
+            ascii(fragment)[2 if PY2 else 1:-1] for fragment in fragments[::2]]
+        text = ''.join(fragments)
 
     return text
 
 
+# high resolution timer (for STATS)
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+def _recorder():
+    """Get recorder of baseline operation statistics (see Baseline.STATS)."""
+    from ._stats import STATS
+    return STATS
+
+
+def render_replacement(updates, indent):
+    """Get baseline replacement source code.
+
+    :param updates: strings compared against baseline
+    :type updates: iterable of str
+    :param int indent: indentation of baseline in source file
+    :returns: source file baseline replacement text
+    :rtype: str
+
+    """
+    # sort updates so Python hash seed has no impact on regression test
+    updates = sorted(updates)
+
+    if len(updates) > 1:
+        for i, text in enumerate(updates):
+            header = '\n'.join([
+                '######################' * 5,
+                '# Baseline Alternative {}'.format(i + 1),
+                '######################' * 5])
+            updates[i] = header + '\n' + text
+
+    text = '\n'.join(updates)
+
+    text_repr = multiline_repr(text, RAW_STRING_SPECIAL_CHARS)
+
+    if text_repr == text:
+        raw_char = 'r' if '\\' in text_repr else ''
+    else:
+        # must have special characters that required added backslash
+        # escaping, use normal representation to get backslashes right
+        text = multiline_repr(text)
+        raw_char = ''
+
+    # use triple double quote, except use triple single quote when
+    # triple double quote is present to avoid syntax errors
+    quotes = '"""'
+    if quotes in text:
+        if "'''" in text:
+            text.replace("'''", "```")
+        else:
+            quotes = "'''"
+
+    # Wrap with blank lines when multi-line or when text ends with
+    # characters that would otherwise result in a syntax error in
+    # the formatted representation.
+    multiline = indent or ('\n' in text)
+    if multiline or text.endswith('\\') or text.endswith(quotes[0]):
+        update = raw_char + quotes + '\n' + text + '\n' + quotes
+    else:
+        update = raw_char + quotes + text + quotes
+
+    indentation = ' ' * indent
+
+    lines = ((indentation + line) if line else '' for line in update.split('\n'))
+
+    return '\n'.join(lines).lstrip()
+
+
 class Baseline(baseclass):
 
     """Baseline string.
@@ -86,22 +221,107 @@ class Baseline(baseclass):
     # print differences (using print_diff() method) when comparison unequal
     PRINT_DIFFS = os.environ.get('BASELINE_PRINT_DIFFS', 'NO').upper() == 'YES'
 
+    # record counts and times of baseline operations (see stats()), print
+    # a summary of them at exit when enabled with the environment variable
+    STATS = os.environ.get('BASELINE_STATS', 'NO').upper() == 'YES'
+
+    # print report of memory retained by each baseline at exit (see
+    # memory_report())
+    MEMORY_REPORT = os.environ.get('BASELINE_MEMORY_REPORT', 'NO').upper() == 'YES'
+
+    # path of file to write profile (cProfile) of update file creation
+    # at exit to
+    PROFILE_PATH = os.environ.get('BASELINE_PROFILE') or None
+
+    # maximum number of differing hunks printed per comparison (0 for no limit)
+    PRINT_DIFFS_MAX_HUNKS = int(
+        os.environ.get('BASELINE_PRINT_DIFFS_MAX_HUNKS', '0')) or None
+
+    # maximum number of difference lines printed per comparison (0 for no
+    # limit), bounds hunks of lines beyond the difference search budget
+    PRINT_DIFFS_MAX_LINES = int(
+        os.environ.get('BASELINE_PRINT_DIFFS_MAX_LINES', '0')) or None
+
+    # operations to perform on strings before comparison, each either
+    # a callable or a (pattern, replacement) regular expression substitution
+    # (consecutive substitutions are applied together in a single pass)
     TRANSFORMS = []
 
+    # TRANSFORMS (as a tuple) and operations compiled from them
+    _compiled_transforms = ((), [])
+
+    # maximum total size (in bytes) of transformed strings to cache (cache
+    # used to avoid repeating transforms of the same string), 0 disables
+    TRANSFORM_CACHE_SIZE = int(os.environ.get('BASELINE_TRANSFORM_CACHE_SIZE', '0'))
+
+    # cache of transformed strings (shared by all Baseline classes)
+    _transform_cache = None
+
+    # merge updates from multiple processes of the same test run (e.g.
+    # pytest-xdist workers)
+    SHARD_UPDATES = os.environ.get('BASELINE_SHARD_UPDATES', 'NO').upper() == 'YES'
+
+    # number of threads used to generate update files at interpreter exit
+    # (scripts are updated one at a time when less than two)
+    UPDATE_WORKERS = int(os.environ.get('BASELINE_UPDATE_WORKERS', '1'))
+
+    # record only a count of comparisons that match the baseline (rather
+    # than retaining the compared strings)
+    DEFER_UPDATES = os.environ.get('BASELINE_DEFER_UPDATES', 'NO').upper() == 'YES'
+
+    # maximum number of distinct compared strings each baseline instance
+    # keeps in memory (others are written to a temporary file), None means
+    # no limit (applies to instances created after it is set)
+    MAX_UPDATES_IN_MEMORY = int(
+        os.environ.get('BASELINE_MAX_UPDATES_IN_MEMORY', '0')) or None
+
+    # write update files (see flush()) once this many strings have been
+    # recorded since the last flush, 0 disables
+    FLUSH_THRESHOLD = int(os.environ.get('BASELINE_FLUSH_THRESHOLD', '0'))
+
+    # write update files (see flush()) when a string is recorded this many
+    # seconds after the last flush, 0 disables
+    FLUSH_INTERVAL = float(os.environ.get('BASELINE_FLUSH_INTERVAL', '0'))
+
+    # number of strings recorded since the last flush and time of last flush
+    _pending = 0
+    _last_flush = time.time()
+
+    # paths of scripts with strings released by a flush (and recorded in
+    # a shard file instead)
+    _flushed_paths = set()
+
     # set of instances of this class where a string comparison against the
     # baseline was a mismatch
     _baselines_to_update = set()
 
+    # set of instances compared while SHARD_UPDATES (strings recorded even
+    # when matching, in case another process of the run updates the script)
+    _compared_baselines = set()
+
     # dictionary of every unique source code location of Baseline instantiation
     # key: source code location of Baseline instantiation (abs path, linenum)
     # value: Baseline instance for a particular location
     _all_instances = {}
 
+    # dictionary of every unique call site (bytecode instruction) that
+    # instantiated a Baseline (to skip path normalization and dedenting
+    # when the same call site instantiates a Baseline repeatedly)
+    # key: (id of code object, instruction offset)
+    # value: (code object, baseline text as passed in, Baseline instance)
+    # (entries for a file are discarded by invalidate_sources())
+    _call_sites = {}
+
     # set of strings compared against this baseline (all Baseline instances
-    # override this attribute with a set() specific to it, it is present as
-    # a class attribute for documentation and pylint warning suppression)
+    # override this attribute with a set() or UpdateStore() specific to it,
+    # it is present as a class attribute for documentation and pylint
+    # warning suppression)
     _updates = None
 
+    # number of comparisons that matched the baseline (the only record of
+    # them when DEFER_UPDATES)
+    _matches = 0
+
     @staticmethod
     def _dedent(text):
         """Remove common indentation from each line in a text block.
@@ -155,9 +375,28 @@ class Baseline(baseclass):
         :raises RuntimeError: when text differs for a specific location
 
         """
-        frame = inspect.getouterframes(inspect.currentframe())[1]
-        path = os.path.abspath(frame[1])
-        linenum = frame[2]
+        started = _clock() if cls.STATS else None
+
+        frame = _caller_frame(1)
+        code = frame.f_code
+        call_site = (id(code), frame.f_lasti)
+
+        try:
+            call_site_code, call_site_text, baseline = cls._call_sites[call_site]
+        except KeyError:
+            pass
+        else:
+            # same instruction, same (usually identical literal) text, and
+            # instance still the one for its location
+            if call_site_code is code and (
+                    text is call_site_text or text == call_site_text) and (
+                    cls._all_instances.get((baseline._path, baseline._linenum)) is baseline):
+                if started is not None:
+                    _recorder().add('construct', _clock() - started)
+                return baseline
+
+        path = os.path.abspath(code.co_filename)
+        linenum = frame.f_lineno
         indent, dedented_text = cls._dedent(text)
 
         key = (path, linenum)
@@ -175,20 +414,144 @@ class Baseline(baseclass):
             baseline._path = path
             baseline._linenum = linenum
             baseline._indent = indent
-            baseline._updates = set()
+            baseline._updates = cls._new_updates()
 
         else:
             if baseclass.__ne__(baseline, dedented_text):
                 raise RuntimeError('varying baseline text not allowed')
 
+        cls._call_sites[call_site] = (code, text, baseline)
+
+        if started is not None:
+            _recorder().add('construct', _clock() - started)
+
         return baseline
 
+    @classmethod
+    def _new_updates(cls):
+        """Get empty record of strings compared against a baseline.
+
+        :returns: set or bounded memory store (see MAX_UPDATES_IN_MEMORY)
+        :rtype: set or UpdateStore
+
+        """
+        if cls.MAX_UPDATES_IN_MEMORY is None:
+            return set()
+
+        from ._updates import UpdateStore
+        return UpdateStore(cls.MAX_UPDATES_IN_MEMORY)
+
+    @classmethod
+    def _transform_operations(cls):
+        """Get operations compiled from TRANSFORMS (recompile when changed).
+
+        :returns: callables accepting and returning a string
+        :rtype: list
+
+        """
+        transforms = tuple(cls.TRANSFORMS)
+        compiled_transforms, operations = cls._compiled_transforms
+
+        if compiled_transforms != transforms:
+            from ._transforms import compile_transforms
+            operations = compile_transforms(transforms)
+            cls._compiled_transforms = (transforms, operations)
+
+        return operations
+
+    @classmethod
+    def _transform(cls, text):
+        """Perform TRANSFORMS operations on string.
+
+        :param str text: string
+        :returns: transformed string
+        :rtype: str
+
+        """
+        operations = cls._transform_operations()
+
+        if operations:
+            started = _clock() if cls.STATS else None
+
+            if cls.TRANSFORM_CACHE_SIZE > 0:
+                cache = Baseline._transform_cache
+                if cache is None or cache.maxsize != cls.TRANSFORM_CACHE_SIZE:
+                    from ._transforms import TransformCache
+                    cache = Baseline._transform_cache = TransformCache(
+                        cls.TRANSFORM_CACHE_SIZE)
+                text = cache.transform(operations, text)
+            else:
+                for operation in operations:
+                    text = operation(text)
+
+            if started is not None:
+                _recorder().add('transform', _clock() - started)
+
+        return text
+
+    @staticmethod
+    def transform_cache_info():
+        """Get statistics of transformed string cache.
+
+        :returns: hits, misses, maximum size, and current size (in bytes)
+        :rtype: namedtuple
+
+        """
+        cache = Baseline._transform_cache
+        from ._transforms import CacheInfo
+        return CacheInfo(0, 0, 0, 0) if cache is None else cache.info()
+
+    @staticmethod
+    def invalidate_sources(path=None):
+        """Discard cached content of source files.
+
+        Source file content (read when updating baselines) is cached
+        until the file modification time or size changes. Use this
+        to discard it when a file may have changed without either
+        changing (for example, when rewritten within the resolution
+        of the file system modification time).
+
+        Also forget the call sites that constructed baselines in the
+        file (releasing the code objects retained to recognize them).
+
+        :param str path: source file path (None for every file)
+
+        """
+        if path is not None:
+            path = os.path.abspath(path)
+
+        _script.invalidate(path)
+
+        if path is None:
+            Baseline._call_sites.clear()
+        else:
+            for call_site, (_code, _text, baseline) in list(Baseline._call_sites.items()):
+                if baseline._path == path:
+                    del Baseline._call_sites[call_site]
+
     def print_diffs(self, other):
-        """Print differences from comparison with other string."""
+        """Print differences from comparison with other string.
+
+        Write each hunk of differences as it is found (up to
+        ``PRINT_DIFFS_MAX_HUNKS`` hunks and ``PRINT_DIFFS_MAX_LINES``
+        lines).
+
+        """
+        started = _clock() if self.STATS else None
+
+        from . import _diff
+
         keepend = True
-        diff_lines = difflib.context_diff(
-            self.splitlines(keepend), other.splitlines(keepend))
-        print(''.join(diff_lines).rstrip())
+        diff_lines = _diff.context_diff(
+            self.splitlines(keepend), other.splitlines(keepend),
+            max_hunks=self.PRINT_DIFFS_MAX_HUNKS, max_lines=self.PRINT_DIFFS_MAX_LINES)
+
+        for line in diff_lines:
+            sys.stdout.write(line if line.endswith('\n') else line + '\n')
+        sys.stdout.flush()
+
+        if started is not None:
+            _recorder().add('diff', _clock() - started)
 
     def __eq__(self, text):
         """Compare string against baseline.
@@ -202,34 +565,81 @@ class Baseline(baseclass):
         :rtype: bool
 
         """
-        for transform in self.TRANSFORMS:
-            text = transform(text)
-
-        # use triple double quote, except use triple single quote when
-        # triple double quote is present to avoid syntax errors
-        if '"""' in text and "'''" in text:
-            raise ValueError(
-                'Both triple quote styles exist in string to be baselined, '
-                'replace either """ or {} before baselining'.format("'''"))
+        started = _clock() if self.STATS else None
 
-        # Save a copy of the string in order to later update the string
-        # in the source code file in the event any comparison against
-        # this baseline fails.
-        self._updates.add(text)
+        text = self._transform(text)
 
+        # (str comparison rejects strings of differing length up front)
         is_equal = super(Baseline, self).__eq__(text)
 
+        if is_equal is NotImplemented:
+            # (nothing recorded, could not be rendered as a baseline)
+            raise TypeError('baseline compared against {} (str expected)'.format(
+                type(text).__name__))
+
+        # Only strings rendered in the source code file need a usable
+        # triple quote style. Defer the scan of a matching string until
+        # this baseline has an update (the matching string being the same
+        # as the baseline, check the baseline itself once it mis-compares).
         if not is_equal:
-            if not self._baselines_to_update:
+            self._check_quotes(text)
+            if self._matches:
+                self._check_quotes(self)
+        elif self in self._baselines_to_update:
+            self._check_quotes(text)
+
+        # Save a copy of the string in order to later update the string
+        # in the source code file in the event any comparison against
+        # this baseline fails. (A matching string need not be saved since
+        # it is the same as the baseline itself.)
+        if is_equal:
+            self._matches += 1
+        if not is_equal or not self.DEFER_UPDATES:
+            self._updates.add(text)
+            Baseline._pending += 1
+
+        if not is_equal or self.SHARD_UPDATES:
+            if not self._baselines_to_update and not self._compared_baselines:
                 atexit.register(Baseline._atexit_callback)
 
+            if self.SHARD_UPDATES:
+                self._compared_baselines.add(self)
+
+        if not is_equal:
             self._baselines_to_update.add(self)
 
             if self.PRINT_DIFFS:
                 self.print_diffs(text)
 
+        if started is not None:
+            # (includes time to transform and print differences)
+            seconds = _clock() - started
+            recorder = _recorder()
+            recorder.add('compare', seconds)
+            recorder.add_comparison((self._path, self._linenum), not is_equal, seconds)
+
+        if self.FLUSH_THRESHOLD and Baseline._pending >= self.FLUSH_THRESHOLD:
+            self.flush()
+        elif self.FLUSH_INTERVAL and time.time() - Baseline._last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+
         return is_equal
 
+    @staticmethod
+    def _check_quotes(text):
+        """Check string may be rendered in a triple quoted string literal.
+
+        :param str text: string to be baselined
+        :raises ValueError: if both triple quote styles exist in string
+
+        """
+        # use triple double quote, except use triple single quote when
+        # triple double quote is present to avoid syntax errors
+        if '"""' in text and "'''" in text:
+            raise ValueError(
+                'Both triple quote styles exist in string to be baselined, '
+                'replace either """ or {} before baselining'.format("'''"))
+
     def __ne__(self, other):
         # not necessary for Python 3 or greater, but override for Python 2
         # for use in regression test where assertNotEqual() is used
@@ -243,6 +653,18 @@ class Baseline(baseclass):
         # problematic comparisions of unrelated Baseline instances)
         return id(self)
 
+    def _compared_strings(self):
+        """Get distinct strings compared against this baseline.
+
+        :returns: compared strings
+        :rtype: set
+
+        """
+        updates = set(self._updates)
+        if self._matches:
+            updates.add(baseclass(self))
+        return updates
+
     @property
     def replacement_sourcecode(self):
         """Baseline replacement source code lines.
@@ -251,52 +673,141 @@ class Baseline(baseclass):
         :rtype: str
 
         """
-        # sort updates so Python hash seed has no impact on regression test
-        updates = [update for update in sorted(self._updates)]
+        return self._render(self._compared_strings(), self._indent)
 
-        if len(updates) > 1:
-            for i, text in enumerate(updates):
-                header = '\n'.join([
-                    '######################' * 5,
-                    '# Baseline Alternative {}'.format(i + 1),
-                    '######################' * 5])
-                updates[i] = header + '\n' + text
+    @classmethod
+    def _render(cls, updates, indent):
+        """Get baseline replacement source code (see render_replacement())."""
+        started = _clock() if cls.STATS else None
 
-        text = '\n'.join(updates)
+        replacement = render_replacement(updates, indent)
 
-        text_repr = multiline_repr(text, RAW_STRING_SPECIAL_CHARS)
+        if started is not None:
+            _recorder().add('render', _clock() - started)
 
-        if text_repr == text:
-            raw_char = 'r' if '\\' in text_repr else ''
-        else:
-            # must have special characters that required added backslash
-            # escaping, use normal representation to get backslashes right
-            text = multiline_repr(text)
-            raw_char = ''
+        return replacement
 
-        # use triple double quote, except use triple single quote when
-        # triple double quote is present to avoid syntax errors
-        quotes = '"""'
-        if quotes in text:
-            if "'''" in text:
-                text.replace("'''", "```")
-            else:
-                quotes = "'''"
-
-        # Wrap with blank lines when multi-line or when text ends with
-        # characters that would otherwise result in a syntax error in
-        # the formatted representation.
-        multiline = self._indent or ('\n' in text)
-        if multiline or text.endswith('\\') or text.endswith(quotes[0]):
-            update = raw_char + quotes + '\n' + text + '\n' + quotes
+    @classmethod
+    def _update_scripts(cls, baselines_to_update, flushing=False):
+        """Create Python script copies with updated baselines.
+
+        :param iterable baselines_to_update: baselines that had a miscompare
+        :param bool flushing: record compared strings in shard files
+            (to release them from memory)
+        :returns:
+            record of every Python file update (key=path,
+            value=script instance)
+        :rtype: dict
+
+        """
+        from . import _shards
+
+        baselines_to_update = set(baselines_to_update)
+        compared_baselines = set(baselines_to_update)
+
+        if cls.SHARD_UPDATES and not Script.TEST_MODE:
+            # record matching strings too (kept as alternatives when another
+            # process of the run updates the script)
+            compared_baselines.update(cls._compared_baselines)
+
+        baselines = {}
+        updated_paths = set()
+
+        for baseline in compared_baselines:
+
+            if baseline._path.endswith('<stdin>'):
+                continue
+
+            baselines.setdefault(baseline._path, []).append(baseline)
+
+            if baseline in baselines_to_update:
+                updated_paths.add(baseline._path)
+
+        def write(script):
+            started = _clock() if cls.STATS else None
+
+            update_filepath = script.update(report=False)
+
+            if started is not None:
+                _recorder().add('write', _clock() - started)
+
+            return update_filepath
+
+        def update_script(path):
+            script = Script(path)
+
+            sharded = cls.SHARD_UPDATES or flushing or path in cls._flushed_paths
+
+            if sharded and not script.TEST_MODE:
+                update_filepath = script.update_filepath
+
+                with _shards.lock(update_filepath):
+                    _shards.write(update_filepath, path, dict(
+                        (baseline._linenum, (baseline._indent, baseline._compared_strings()))
+                        for baseline in baselines[path]), path in updated_paths)
+
+                    if cls.SHARD_UPDATES:
+                        merged, updated = _shards.read_run(update_filepath)
+                    else:
+                        # only this process's strings (flushed earlier)
+                        _path, merged, updated = _shards.read(
+                            _shards.own_shard_path(update_filepath))
+
+                    if not updated:
+                        # every string matched (in every process so far)
+                        _shards.remove_own(update_filepath)
+                        return None
+
+                    for linenum, (indent, updates) in merged.items():
+                        script.add_update(linenum, cls._render(updates, indent))
+
+                    if not cls.SHARD_UPDATES and not flushing:
+                        # final update, shard no longer needed
+                        _shards.remove_own(update_filepath)
+
+                    return script, write(script)
+
+            for baseline in baselines[path]:
+                script.add_update(baseline._linenum, baseline.replacement_sourcecode)
+            return script, write(script)
+
+        paths = sorted(baselines)
+        workers = min(cls.UPDATE_WORKERS, len(paths))
+
+        pool = None
+
+        if workers > 1:
+            from multiprocessing.pool import ThreadPool
+
+            try:
+                pool = ThreadPool(workers)
+            except RuntimeError:
+                # new threads not allowed during interpreter shutdown
+                # (Python 3.12), update scripts one at a time instead
+                pool = None
+
+        if pool is not None:
+            try:
+                results = pool.map(update_script, paths)
+            finally:
+                pool.close()
+                pool.join()
         else:
-            update = raw_char + quotes + text + quotes
+            results = (update_script(path) for path in paths)
+
+        updated_scripts = {}
+        update_filepaths = []
 
-        indent = ' ' * self._indent
+        # report in sorted order regardless of the order updates completed
+        for script, update_filepath in filter(None, results):
+            updated_scripts[script.path] = script
+            if update_filepath:
+                update_filepaths.append(update_filepath)
+                print('BASELINE UPDATE: ' + update_filepath)
 
-        lines = ((indent + line) if line else '' for line in update.split('\n'))
+        Script.record_updates(update_filepaths)
 
-        return '\n'.join(lines).lstrip()
+        return updated_scripts
 
     @classmethod
     def _atexit_callback(cls):
@@ -312,24 +823,103 @@ class Baseline(baseclass):
         :rtype: dict
 
         """
-        updated_scripts = {}
+        if cls.PROFILE_PATH:
+            import cProfile
 
-        for baseline in cls._baselines_to_update:
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(cls._update_scripts, cls._baselines_to_update)
+            finally:
+                profiler.dump_stats(cls.PROFILE_PATH)
 
-            if baseline._path.endswith('<stdin>'):
-                continue
+        return cls._update_scripts(cls._baselines_to_update)
 
-            try:
-                script = updated_scripts[baseline._path]
-            except KeyError:
-                script = Script(baseline._path)
-                updated_scripts[baseline._path] = script
+    @staticmethod
+    def stats(reset=False):
+        """Get counts and times of baseline operations (when STATS enabled).
+
+        Phases are ``construct``, ``transform``, ``compare`` (which
+        includes the time to transform and print differences), ``diff``,
+        ``render``, and ``write``.
 
-            script.add_update(baseline._linenum, baseline.replacement_sourcecode)
+        :param bool reset: discard statistics after getting them
+        :returns: count and total seconds of each phase (key: phase) and
+            number of comparisons, mismatches, and total seconds of each
+            baseline (key: (path, line number))
+        :rtype: namedtuple
 
-        for key in sorted(updated_scripts):
-            script = updated_scripts[key]
-            script.update()
+        """
+        recorder = _recorder()
+        snapshot = recorder.snapshot()
+        if reset:
+            recorder.reset()
+        return snapshot
+
+    @staticmethod
+    def memory_report():
+        """Account for memory retained by each baseline.
+
+        Report the number of compared strings each baseline keeps in
+        memory and the bytes retained by them (along with the baseline
+        itself). When ``tracemalloc`` is tracing, also report where the
+        largest compared string of each baseline was allocated.
+
+        :returns: entry for each baseline (those retaining the most first)
+            with fields path, linenum, values, size, spilled, and allocated
+        :rtype: list of namedtuple
+
+        """
+        from . import _memory
+        return _memory.report(Baseline._all_instances.values())
+
+    @staticmethod
+    def _print_memory_report():
+        """Print report of memory retained by baselines."""
+        from . import _memory
+
+        print('BASELINE MEMORY:')
+        print(_memory.format_report(Baseline.memory_report(), Script.showpath))
+
+    @staticmethod
+    def _print_stats():
+        """Print summary of counts and times of baseline operations."""
+        print('BASELINE STATS:')
+        print(_recorder().summary(Script.showpath))
+
+    @staticmethod
+    def flush():
+        """Write update files for baselines with strings recorded so far.
+
+        Record the strings compared against baselines that had a
+        miscompare in shard files and write the update files. Then
+        release the strings from memory. Update files written later (by
+        another flush or at interpreter exit) include the released
+        strings.
+
+        :returns:
+            record of every Python file update (key=path,
+            value=script instance)
+        :rtype: dict
+
+        """
+        Baseline._pending = 0
+        Baseline._last_flush = time.time()
+
+        pending = [
+            baseline for baseline in Baseline._baselines_to_update
+            if baseline._matches or len(baseline._updates)]
+
+        if Script.TEST_MODE:
+            # nowhere to record released strings
+            return Baseline._update_scripts(pending)
+
+        updated_scripts = Baseline._update_scripts(pending, flushing=True)
+
+        for baseline in pending:
+            baseline._updates = baseline._new_updates()
+            baseline._matches = 0
+
+        Baseline._flushed_paths.update(updated_scripts)
 
         return updated_scripts
 
@@ -345,6 +935,16 @@ class RawBaseline(Baseline):
     """
 
     def __new__(cls, text):
+        from warnings import warn
+
         warn('RawBaseline() deprecated, use equivalent Baseline() instead',
              DeprecationWarning)
         return super(RawBaseline, cls).__new__(cls, text)
+
+
+# (registered first so reports print after update files are written)
+if Baseline.MEMORY_REPORT:
+    atexit.register(Baseline._print_memory_report)
+
+if Baseline.STATS:
+    atexit.register(Baseline._print_stats)
@@ -0,0 +1,346 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+# default limit on the number of line insertions and deletions searched
+# for before treating the remaining differing lines as replaced
+MAX_EDITS = 1000
+
+_PREFIXES = {'insert': '+ ', 'delete': '- ', 'replace': '! ', 'equal': '  '}
+
+# lines noting output stopped short of the remaining differences
+_TRUNCATED = ('***************\n', '*** (further differences not shown) ***\n')
+
+
+def _edits(a, b, alo, ahi, blo, bhi, max_edits):
+    """Find shortest edit script using Myers' O(ND) difference algorithm.
+
+    :param list a: lines
+    :param list b: lines
+    :param int alo: start index of lines in ``a`` to compare
+    :param int ahi: end index of lines in ``a`` to compare
+    :param int blo: start index of lines in ``b`` to compare
+    :param int bhi: end index of lines in ``b`` to compare
+    :param int max_edits: maximum number of insertions and deletions
+    :returns: one edit (tag, index in a, index in b) per line in order
+        (or None if edit script exceeds maximum number of edits)
+    :rtype: list
+
+    """
+    n = ahi - alo
+    m = bhi - blo
+
+    # furthest reaching x (index in a) on each diagonal k = x - y
+    furthest = {1: 0}
+    trace = []
+
+    for d in range(min(n + m, max_edits) + 1):
+        trace.append(dict(furthest))
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and furthest[k - 1] < furthest[k + 1]):
+                x = furthest[k + 1]
+            else:
+                x = furthest[k - 1] + 1
+            y = x - k
+
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+
+            furthest[k] = x
+
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+    else:
+        return None
+
+    # walk back through the furthest reaching paths to recover the edits
+    edits = []
+    x, y = n, m
+
+    for d in range(len(trace) - 1, -1, -1):
+        furthest = trace[d]
+        k = x - y
+
+        if k == -d or (k != d and furthest[k - 1] < furthest[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+
+        prev_x = furthest[prev_k]
+        prev_y = prev_x - prev_k
+
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            edits.append(('equal', alo + x, blo + y))
+
+        if d:
+            if x == prev_x:
+                edits.append(('insert', alo + x, blo + prev_y))
+            else:
+                edits.append(('delete', alo + prev_x, blo + y))
+
+        x, y = prev_x, prev_y
+
+    edits.reverse()
+
+    return edits
+
+
+def _opcodes(a, b, alo, ahi, blo, bhi, max_edits):
+    """Generate operations to turn lines of one sequence into another.
+
+    :returns: (tag, i1, i2, j1, j2) operations (same as those of
+        :meth:`difflib.SequenceMatcher.get_opcodes`)
+    :rtype: generator
+
+    """
+    edits = _edits(a, b, alo, ahi, blo, bhi, max_edits)
+
+    if edits is None:
+        if alo == ahi:
+            yield ('insert', alo, ahi, blo, bhi)
+        elif blo == bhi:
+            yield ('delete', alo, ahi, blo, bhi)
+        else:
+            yield ('replace', alo, ahi, blo, bhi)
+        return
+
+    i, j = alo, blo
+    equal = None
+
+    for tag, i_edit, j_edit in edits + [('equal', ahi, bhi)]:
+        if tag != 'equal':
+            continue
+
+        # flush insertions and deletions preceding matching line
+        if i < i_edit or j < j_edit:
+            if equal:
+                yield equal
+                equal = None
+            if i == i_edit:
+                yield ('insert', i, i, j, j_edit)
+            elif j == j_edit:
+                yield ('delete', i, i_edit, j, j)
+            else:
+                yield ('replace', i, i_edit, j, j_edit)
+            i, j = i_edit, j_edit
+
+        if i_edit < ahi:
+            if equal:
+                equal = ('equal', equal[1], i + 1, equal[3], j + 1)
+            else:
+                equal = ('equal', i, i + 1, j, j + 1)
+            i, j = i + 1, j + 1
+
+    if equal:
+        yield equal
+
+
+def _common_lengths(a, b):
+    """Get number of identical leading and trailing lines.
+
+    :param list a: lines
+    :param list b: lines
+    :returns: number of leading lines, number of trailing lines
+    :rtype: tuple
+
+    """
+    limit = min(len(a), len(b))
+
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+
+    return prefix, suffix
+
+
+def iter_opcodes(a, b, max_edits=MAX_EDITS):
+    """Generate operations to turn lines of one sequence into another.
+
+    Identical leading and trailing lines are set aside before searching
+    for differences so that only the differing window is searched.
+
+    :param list a: lines
+    :param list b: lines
+    :param int max_edits: maximum number of line insertions and deletions
+    :returns: (tag, i1, i2, j1, j2) operations (same as those of
+        :meth:`difflib.SequenceMatcher.get_opcodes`)
+    :rtype: generator
+
+    """
+    prefix, suffix = _common_lengths(a, b)
+    ahi = len(a) - suffix
+    bhi = len(b) - suffix
+
+    if prefix:
+        yield ('equal', 0, prefix, 0, prefix)
+    if prefix < ahi or prefix < bhi:
+        for code in _opcodes(a, b, prefix, ahi, prefix, bhi, max_edits):
+            yield code
+    if suffix:
+        yield ('equal', ahi, len(a), bhi, len(b))
+
+
+def opcodes(a, b, max_edits=MAX_EDITS):
+    """Get operations to turn lines of one sequence into another.
+
+    :param list a: lines
+    :param list b: lines
+    :param int max_edits: maximum number of line insertions and deletions
+    :returns: (tag, i1, i2, j1, j2) operations (see :func:`iter_opcodes`)
+    :rtype: list
+
+    """
+    return list(iter_opcodes(a, b, max_edits))
+
+
+def grouped_opcodes(a, b, n=3, max_edits=MAX_EDITS):
+    """Generate groups of operations with up to n lines of context.
+
+    Same as :meth:`difflib.SequenceMatcher.get_grouped_opcodes` except
+    differences are found with :func:`iter_opcodes` in O((N+M)D) time
+    and each group is generated as soon as its operations are (rather
+    than after every operation is). When more than ``max_edits`` line
+    insertions and deletions are needed, remaining differing lines are
+    reported as replaced.
+
+    :param list a: lines
+    :param list b: lines
+    :param int n: number of lines of context
+    :param int max_edits: maximum number of line insertions and deletions
+    :returns: lists of (tag, i1, i2, j1, j2) operations
+    :rtype: generator
+
+    """
+    codes = iter_opcodes(a, b, max_edits)
+    code = next(codes, None)
+    leading = True
+
+    nn = n + n
+    group = []
+    while code is not None:
+        tag, i1, i2, j1, j2 = code
+        code = next(codes, None)
+
+        if tag == 'equal':
+            # fixup leading and trailing groups if they show no changes
+            if leading:
+                i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+            if code is None:
+                i2, j2 = min(i2, i1 + n), min(j2, j1 + n)
+
+            # end the current group and start a new one whenever
+            # there is a large range with no changes
+            if i2 - i1 > nn:
+                group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+                yield group
+                group = []
+                i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+
+        leading = False
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start, stop):
+    """Convert range to the "ed" format."""
+    beginning = start + 1
+    length = stop - start
+    if not length:
+        beginning -= 1
+    if length <= 1:
+        return '{}'.format(beginning)
+    return '{},{}'.format(beginning, beginning + length - 1)
+
+
+def _context_diff(a, b, fromfile, tofile, n, max_hunks, max_edits):
+    """Generate context diff lines (see :func:`context_diff`)."""
+    for count, group in enumerate(grouped_opcodes(a, b, n, max_edits)):
+        if not count:
+            yield '*** {}\n'.format(fromfile)
+            yield '--- {}\n'.format(tofile)
+
+        if max_hunks is not None and count >= max_hunks:
+            for line in _TRUNCATED:
+                yield line
+            break
+
+        first, last = group[0], group[-1]
+        yield '***************\n'
+
+        yield '*** {} ****\n'.format(_format_range(first[1], last[2]))
+        if any(tag in ('replace', 'delete') for tag, _, _, _, _ in group):
+            for tag, i1, i2, _, _ in group:
+                if tag != 'insert':
+                    for line in a[i1:i2]:
+                        yield _PREFIXES[tag] + line
+
+        yield '--- {} ----\n'.format(_format_range(first[3], last[4]))
+        if any(tag in ('replace', 'insert') for tag, _, _, _, _ in group):
+            for tag, _, _, j1, j2 in group:
+                if tag != 'delete':
+                    for line in b[j1:j2]:
+                        yield _PREFIXES[tag] + line
+
+
+def context_diff(a, b, fromfile='', tofile='', n=3, max_hunks=None,
+                 max_edits=MAX_EDITS, max_lines=None):
+    """Generate context diff lines as each group of differences is found.
+
+    Same output as :func:`difflib.context_diff` (except differences
+    are found with :func:`grouped_opcodes`). Stop after ``max_hunks``
+    hunks or ``max_lines`` lines (whichever comes first) with a line
+    noting the differences not shown. (A hunk of lines beyond the
+    ``max_edits`` budget, all reported as replaced, may be long.)
+
+    :param list a: lines (including line endings)
+    :param list b: lines (including line endings)
+    :param str fromfile: name of file ``a`` lines are from
+    :param str tofile: name of file ``b`` lines are from
+    :param int n: number of lines of context
+    :param int max_hunks: maximum number of hunks (None for no limit)
+    :param int max_edits: maximum number of line insertions and deletions
+    :param int max_lines: maximum number of lines (None for no limit)
+    :returns: diff lines
+    :rtype: generator
+
+    """
+    lines = _context_diff(a, b, fromfile, tofile, n, max_hunks, max_edits)
+
+    for count, line in enumerate(lines):
+        if max_lines is not None and count >= max_lines:
+            for marker in _TRUNCATED:
+                yield marker
+            break
+        yield line
@@ -0,0 +1,171 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+import tokenize
+from collections import namedtuple
+
+
+LiteralSpan = namedtuple('LiteralSpan', [
+    'start_linenum',  # line number of first line of literal
+    'start_col',  # column of first character (including prefix)
+    'end_linenum',  # line number of last line of literal
+    'end_col',  # column following last character
+    'prefix',  # string prefix (e.g. 'r', 'u', or '')
+    'quotes',  # delimiter (triple double or triple single quotes)
+    'start',  # offset of first character (including prefix) in file content
+    'end',  # offset following last character in file content
+])
+
+
+class LiteralIndex(object):
+
+    """Index of triple quoted string literals in Python source code."""
+
+    # cache of indexes for files (key: path, value: (stat key, index))
+    _cache = {}
+
+    def __init__(self, text):
+        """Tokenize source code and index triple quoted string literals.
+
+        :param str text: Python source code
+
+        """
+        lines = text.split('\n')
+
+        line_offsets = [0]
+        for line in lines:
+            line_offsets.append(line_offsets[-1] + len(line) + 1)
+
+        spans = []
+
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            if token[0] != tokenize.STRING:
+                continue
+
+            token_text = token[1]
+            prefix_len = len(token_text) - len(token_text.lstrip('bBfFrRuU'))
+            quotes = token_text[prefix_len:prefix_len + 3]
+
+            if quotes not in ('"""', "'''"):
+                continue
+
+            (start_linenum, start_col), (end_linenum, end_col) = token[2:4]
+
+            spans.append(LiteralSpan(
+                start_linenum, start_col, end_linenum, end_col,
+                token_text[:prefix_len], quotes,
+                line_offsets[start_linenum - 1] + start_col,
+                line_offsets[end_linenum - 1] + end_col))
+
+        self.spans = spans
+
+        # index of first literal starting on or after each line (and of last
+        # literal ending on or before each line) for constant time lookups
+        # (entry zero is unused since line numbers start at one)
+        self._starting = starting = [len(spans)] * (len(lines) + 2)
+        self._ending = ending = [-1] * (len(lines) + 2)
+
+        index = len(spans)
+        for linenum in range(len(starting) - 1, 0, -1):
+            while index > 0 and spans[index - 1].start_linenum >= linenum:
+                index -= 1
+            starting[linenum] = index
+
+        index = -1
+        for linenum in range(1, len(ending)):
+            while index + 1 < len(spans) and spans[index + 1].end_linenum <= linenum:
+                index += 1
+            ending[linenum] = index
+
+    def first_starting_at(self, linenum):
+        """Get first literal starting on or after a line.
+
+        :param int linenum: line number
+        :returns: literal location (or None if none found)
+        :rtype: LiteralSpan
+
+        """
+        index = self._starting[min(max(linenum, 1), len(self._starting) - 1)]
+        return self.spans[index] if index < len(self.spans) else None
+
+    def last_ending_at(self, linenum):
+        """Get last literal ending on or before a line.
+
+        :param int linenum: line number
+        :returns: literal location (or None if none found)
+        :rtype: LiteralSpan
+
+        """
+        if linenum < 1:
+            return None
+        index = self._ending[min(linenum, len(self._ending) - 1)]
+        return self.spans[index] if index >= 0 else None
+
+    @staticmethod
+    def stat_key(path):
+        """Get file modification key (changes whenever file content changes).
+
+        :param str path: file path
+        :returns: modification time and size
+        :rtype: tuple
+
+        """
+        stat_info = os.stat(path)
+        return getattr(stat_info, 'st_mtime_ns', stat_info.st_mtime), stat_info.st_size
+
+    @classmethod
+    def for_file(cls, path, lines, stat_key):
+        """Get index for file content (cached by path and modification key).
+
+        :param str path: file path
+        :param list lines: file content lines
+        :param tuple stat_key: modification key of file when content was read
+        :returns: literal index
+        :rtype: LiteralIndex
+
+        """
+        try:
+            cached_key, index = cls._cache[path]
+        except KeyError:
+            cached_key = index = None
+
+        if cached_key != stat_key:
+            index = cls('\n'.join(lines))
+            cls._cache[path] = (stat_key, index)
+
+        return index
+
+    @classmethod
+    def invalidate(cls, path=None):
+        """Discard cached index of file.
+
+        :param str path: file path (None for every file)
+
+        """
+        if path is None:
+            cls._cache.clear()
+        else:
+            cls._cache.pop(path, None)
@@ -0,0 +1,96 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Record of baseline update files written.
+
+When update files are generated, their locations are appended to a
+manifest file so that the command line tool may find them without
+searching the directory tree.
+
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+
+MANIFEST_NAME = '.baseline-updates'
+
+
+def append(dirpath, update_filepaths):
+    """Add update file locations to manifest.
+
+    :param str dirpath: directory containing manifest
+    :param list update_filepaths: update file paths
+
+    """
+    if update_filepaths:
+        entries = ''.join(os.path.abspath(path) + '\n' for path in update_filepaths)
+        # single write of all entries (in append mode) to keep entries from
+        # concurrent processes intact
+        with io.open(os.path.join(dirpath, MANIFEST_NAME), 'a', encoding='utf-8') as fh:
+            fh.write(entries)
+
+
+def read(dirpath):
+    """Read update file locations from manifest.
+
+    :param str dirpath: directory containing manifest
+    :returns: absolute update file paths (sorted, duplicates removed), None
+        when manifest missing or stale (an update file no longer exists)
+    :rtype: list of str
+
+    """
+    try:
+        with io.open(os.path.join(dirpath, MANIFEST_NAME), 'r', encoding='utf-8') as fh:
+            update_filepaths = sorted(set(line for line in fh.read().split('\n') if line))
+    except (OSError, IOError):
+        return None
+
+    if not all(os.path.isfile(path) for path in update_filepaths):
+        return None
+
+    return update_filepaths
+
+
+def prune(dirpath):
+    """Remove entries for update files that no longer exist from manifest.
+
+    Remove manifest entirely when no update files remain.
+
+    :param str dirpath: directory containing manifest
+
+    """
+    path = os.path.join(dirpath, MANIFEST_NAME)
+
+    try:
+        with io.open(path, 'r', encoding='utf-8') as fh:
+            entries = [line for line in fh.read().split('\n') if line]
+    except (OSError, IOError):
+        return
+
+    remaining = sorted(set(entry for entry in entries if os.path.isfile(entry)))
+
+    if remaining:
+        with io.open(path, 'w', encoding='utf-8') as fh:
+            fh.write(''.join(entry + '\n' for entry in remaining))
+    else:
+        os.remove(path)
@@ -0,0 +1,114 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import sys
+from collections import namedtuple
+
+# number of baselines listed in report (those retaining the most memory)
+REPORT_BASELINES = 20
+
+MemoryEntry = namedtuple('MemoryEntry', 'path linenum values size spilled allocated')
+
+
+def _allocated(value):
+    """Get location where string was allocated (when tracemalloc tracing)."""
+    try:
+        import tracemalloc
+    except ImportError:  # pragma: no cover
+        return None
+
+    if not tracemalloc.is_tracing():
+        return None
+
+    traceback = tracemalloc.get_object_traceback(value)
+    if traceback is None:
+        return None
+
+    frame = traceback[0]
+    return '{}:{}'.format(frame.filename, frame.lineno)
+
+
+def memory_entry(baseline):
+    """Account for memory retained by a baseline.
+
+    :param Baseline baseline: baseline instance
+    :returns: baseline location, number of compared strings kept in memory,
+        bytes retained (baseline, compared strings and their container),
+        number of compared strings written to a temporary file, and location
+        where the largest compared string was allocated (when tracemalloc
+        is tracing, otherwise None)
+    :rtype: MemoryEntry
+
+    """
+    updates = baseline._updates
+    values = list(updates) if isinstance(updates, (set, frozenset)) else updates.values
+
+    size = sys.getsizeof(baseline) + sys.getsizeof(updates)
+    size += sum(sys.getsizeof(value) for value in values)
+
+    largest = max(values, key=len) if values else None
+
+    return MemoryEntry(
+        baseline._path, baseline._linenum, len(values), size,
+        getattr(updates, 'spilled', 0),
+        None if largest is None else _allocated(largest))
+
+
+def report(baselines):
+    """Account for memory retained by baselines.
+
+    :param iterable baselines: baseline instances
+    :returns: entry for each baseline (those retaining the most first)
+    :rtype: list of MemoryEntry
+
+    """
+    entries = [memory_entry(baseline) for baseline in baselines]
+    entries.sort(key=lambda entry: (-entry.size, entry.path, entry.linenum))
+    return entries
+
+
+def format_report(entries, showpath=None):
+    """Format memory report as a text table.
+
+    :param list entries: memory report entries
+    :param callable showpath: convert path for display
+    :returns: table of the baselines retaining the most memory
+    :rtype: str
+
+    """
+    lines = ['{:<50} {:>8} {:>12} {:>8}  {}'.format(
+        'baseline', 'values', 'bytes', 'spilled', 'largest value allocated at')]
+
+    for entry in entries[:REPORT_BASELINES]:
+        location = '{}:{}'.format(showpath(entry.path) if showpath else entry.path, entry.linenum)
+        lines.append('{:<50} {:>8} {:>12} {:>8}  {}'.format(
+            location, entry.values, entry.size, entry.spilled, entry.allocated or '-'))
+
+    if len(entries) > REPORT_BASELINES:
+        lines.append('({} more baselines)'.format(len(entries) - REPORT_BASELINES))
+
+    lines.append('total: {} values, {} bytes'.format(
+        sum(entry.values for entry in entries), sum(entry.size for entry in entries)))
+
+    return '\n'.join(lines)
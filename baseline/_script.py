@@ -22,11 +22,13 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import errno
 import io
 import os
-import re
 import sys
 
+from . import _manifest
+
 
 def _get_env_path(name, check=False):
     if MOVE_UPDATES:
@@ -49,12 +51,112 @@ def _get_env_path(name, check=False):
     return path
 
 
+# rename replacing any existing destination (atomic where supported)
+_replace = getattr(os, 'replace', os.rename)
+
+
+def write_atomically(filepath, chunks, stat_info=None):
+    """Write file by way of a temporary file in the same directory.
+
+    Rename the temporary file once written so that the file is never
+    observed partially written (and remove it if writing fails).
+
+    :param str filepath: file path
+    :param chunks: file content (iterable of str)
+    :param stat_info: status of file to copy permissions and ownership
+        from (None to keep those of the temporary file)
+
+    """
+    import tempfile
+
+    handle, temp_filepath = tempfile.mkstemp(
+        suffix='.tmp', prefix=os.path.basename(filepath) + '.',
+        dir=os.path.dirname(filepath))
+
+    try:
+        with io.open(handle, 'w', encoding='utf-8') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+
+        if stat_info is not None:
+            os.chmod(temp_filepath, stat_info.st_mode)
+            try:
+                os.chown(temp_filepath, stat_info.st_uid, stat_info.st_gid)
+            except AttributeError:
+                pass  # must be windows
+
+        _replace(temp_filepath, filepath)
+
+    except BaseException:
+        os.remove(temp_filepath)
+        raise
+
+
+def makedirs(dirpath):
+    """Create directory (and parent directories) unless it exists.
+
+    Tolerate the directory being created concurrently (by another thread
+    or process) between checking for it and creating it.
+
+    :param str dirpath: directory path
+
+    """
+    if dirpath and not os.path.isdir(dirpath):
+        try:
+            os.makedirs(dirpath)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+
 MOVE_UPDATES = os.environ.get('BASELINE_MOVE_UPDATES', 'NO').upper() == 'YES'
-UPDATES_PATH = _get_env_path('BASELINE_UPDATES_PATH')
-RELPATH_BASE = _get_env_path('BASELINE_RELPATH_BASE', check=True)
 
+# (BASELINE_UPDATES_PATH, BASELINE_RELPATH_BASE) once evaluated
+_env_paths = None
+
+
+def get_env_paths():
+    """Get locations to move updates to and relative to.
+
+    Evaluate the environment variables when first needed (rather than
+    at import).
+
+    :returns: BASELINE_UPDATES_PATH and BASELINE_RELPATH_BASE (both
+        None when not moving updates)
+    :rtype: tuple
 
-DELIMITER_EXPRESSION = '"""' + '|' "'''"
+    """
+    global _env_paths
+
+    if _env_paths is None:
+        _env_paths = (
+            _get_env_path('BASELINE_UPDATES_PATH'),
+            _get_env_path('BASELINE_RELPATH_BASE', check=True))
+
+    return _env_paths
+
+
+# cache of source file lines shared by Script instances (to avoid reading
+# unchanged files again) (key: path, value: (stat key, lines))
+_sources = {}
+
+
+def invalidate(path=None):
+    """Discard cached source lines (and literal index) of file.
+
+    Cached source is otherwise only discarded when the file modification
+    time or size changes.
+
+    :param str path: file path (None for every file)
+
+    """
+    if path is None:
+        _sources.clear()
+    else:
+        _sources.pop(path, None)
+
+    from ._literals import LiteralIndex
+    LiteralIndex.invalidate(path)
 
 
 class Script(object):
@@ -64,9 +166,14 @@ class Script(object):
     # for regression test purposes (suppresses console output and file writes)
     TEST_MODE = False
 
+    # number of lines written to update file at a time
+    WRITE_CHUNK_LINES = 1000
+
     def __init__(self, path):
         self.path = path
         self._lines = None
+        self._stat_key = None
+        self._literals = None
         self.updates = {}
 
     @staticmethod
@@ -91,6 +198,19 @@ class Script(object):
                 retval = path
         return retval
 
+    @staticmethod
+    def record_updates(update_filepaths):
+        """Add update file locations to update manifest.
+
+        Manifest resides in ``BASELINE_UPDATES_PATH`` (when moving
+        updates) or the current working directory.
+
+        :param list update_filepaths: update file paths
+
+        """
+        updates_path = get_env_paths()[0]
+        _manifest.append(updates_path or os.getcwd(), update_filepaths)
+
     def add_update(self, linenum, update):
         """Register baseline representation replacement text.
 
@@ -100,103 +220,189 @@ class Script(object):
         """
         self.updates[linenum] = update
 
+    @property
+    def update_filepath(self):
+        """Location of script copy with updated baselines."""
+        update_filepath = self.path + '.update'
+        updates_path, relpath_base = get_env_paths()
+
+        if updates_path:
+            relpath = os.path.relpath(update_filepath, relpath_base).replace(
+                '..' + os.path.sep, '.up.' + os.path.sep)
+
+            update_filepath = os.path.join(updates_path, relpath)
+
+        return update_filepath
+
     @property
     def lines(self):
         """List of file lines."""
         if self._lines is None:
-            with io.open(self.path, 'r', encoding='utf-8') as fh:
-                self._lines = fh.read().split('\n')
+            from ._literals import LiteralIndex
+            stat_key = LiteralIndex.stat_key(self.path)
 
-        return self._lines
+            try:
+                cached_key, lines = _sources[self.path]
+            except KeyError:
+                cached_key = lines = None
 
-    # used to replace baseline string representation
-    REGEX = re.compile(
-        '(?P<prefix>.*?)'  # stuff to retain before string representation
-        '[rR]?(?P<delim>{})'  # multi-line string beginning delimeter
-        '(?P<docstr>.*?)'  # current representation
-        '(?P=delim)'  # multi-line string ending delimeter
-        '(?P<suffix>.*)'.format(DELIMITER_EXPRESSION),  # stuff to retain after
-        re.DOTALL)
+            if cached_key != stat_key:
+                with io.open(self.path, 'r', encoding='utf-8') as fh:
+                    lines = fh.read().split('\n')
+                _sources[self.path] = (stat_key, lines)
 
-    def replace_baseline_repr(self, linenum, update):
-        """Replace individual baseline representation.
+            self._stat_key = stat_key
+            # copy to keep cached lines intact
+            self._lines = list(lines)
 
-        :param int linenum: location of baseline representation
-        :param str update: new baseline representation text (with delimiters)
+        return self._lines
 
-        """
+    @property
+    def literals(self):
+        """Index of triple quoted string literals in file lines."""
         # use property to access lines to read them from file if necessary
         lines = self.lines
 
-        count = 0
-        delimiter = None
+        if self._literals is None:
+            from ._literals import LiteralIndex
 
+            if self._stat_key is None:
+                # lines modified, content no longer matches file
+                self._literals = LiteralIndex('\n'.join(lines))
+            else:
+                self._literals = LiteralIndex.for_file(self.path, lines, self._stat_key)
+
+        return self._literals
+
+    def _locate_literal(self, linenum):
+        """Locate baseline string literal.
+
+        :param int linenum: location of baseline representation
+        :returns: literal location
+        :rtype: LiteralSpan
+        :raises RuntimeError: when no literal corresponds to location
+
+        """
         if sys.version_info >= (3, 8):
-            linenum -= 1
+            # line number is that of first line in statement, use first
+            # literal starting on or after that line
+            span = self.literals.first_starting_at(linenum)
+
+            if span is None:
+                docstr_not_found = (
+                    '{}:{}: could not find docstring'.format(self.path, linenum))
+                raise RuntimeError(docstr_not_found)
         else:
-            for index in range(linenum - 1, -1, -1):
-                line = lines[index]
-                if delimiter is None:
-                    single_quote_index = line.rfind("'''")
-                    double_quote_index = line.rfind('"""')
-                    if double_quote_index >= 0:
-                        if double_quote_index > single_quote_index:
-                            delimiter = '"""'
-                        else:
-                            delimiter = "'''"
-                    elif single_quote_index >= 0:
-                        delimiter = "'''"
-                    else:
-                        continue
-                count += lines[index].count(delimiter)
-                if count >= 2:
-                    linenum = index
-                    break
-            else:
+            # line number is that of last line in statement, use last
+            # literal ending on or before that line
+            span = self.literals.last_ending_at(linenum)
+
+            if span is None:
                 docstr_not_found = (
                     '{}:{}: could not find baseline docstring'
                     ''.format(self.showpath(self.path), linenum))
                 raise RuntimeError(docstr_not_found)
 
-        old_content = '\n'.join(lines[linenum:])
+        return span
 
-        match = self.REGEX.match(old_content)
+    def _replace_literals(self, updates):
+        """Replace baseline representations.
 
-        if match is None:
-            docstr_not_found = (
-                '{}:{}: could not find docstring'.format(self.path, linenum))
-            raise RuntimeError(docstr_not_found)
+        Locate every baseline representation with the literal index and
+        then form the new lines with a single pass (splitting only the
+        edited lines rather than the entire content).
 
-        new_content = match.group('prefix') + update + match.group('suffix')
+        :param dict updates:
+            new baseline representation text with delimiters
+            (key: location of baseline representation)
 
-        lines[linenum:] = new_content.split('\n')
+        """
+        # when two locations correspond to the same literal, the update
+        # for the first location wins
+        edits = {}
+        for linenum in sorted(updates, reverse=True):
+            edits[self._locate_literal(linenum)] = updates[linenum]
 
-    def update(self):
-        """Replace baseline representations previously registered for update."""
-        for linenum in reversed(sorted(self.updates)):
-            self.replace_baseline_repr(linenum, self.updates[linenum])
+        lines = self.lines
+        new_lines = []
 
-        if not self.TEST_MODE:
-            update_filepath = self.path + '.update'
+        # line number and column following the last literal replaced
+        # (and new text of that line preceding the column)
+        linenum, col, head = 1, 0, ''
 
-            if UPDATES_PATH:
-                relpath = os.path.relpath(update_filepath, RELPATH_BASE).replace(
-                    '..' + os.path.sep, '.up.' + os.path.sep)
+        for span in sorted(edits):
+            # retain prefix (except raw string designator)
+            start_col = span.start_col + len(span.prefix)
+            if span.prefix[-1:] in ('r', 'R'):
+                start_col -= 1
 
-                update_filepath = os.path.join(UPDATES_PATH, relpath)
-                update_dirpath = os.path.dirname(update_filepath)
+            if span.start_linenum == linenum:
+                head += lines[linenum - 1][col:start_col]
+            else:
+                new_lines.append(head + lines[linenum - 1][col:])
+                new_lines.extend(lines[linenum:span.start_linenum - 1])
+                head = lines[span.start_linenum - 1][:start_col]
 
-                if not os.path.exists(update_dirpath):
-                    os.makedirs(update_dirpath)
+            replacement = (head + edits[span]).split('\n')
+            new_lines.extend(replacement[:-1])
+            head = replacement[-1]
 
-            with io.open(update_filepath, 'w', encoding='utf-8') as fh:
-                fh.write('\n'.join(self.lines))
+            linenum, col = span.end_linenum, span.end_col
 
-            stat_info = os.stat(self.path)
-            os.chmod(update_filepath, stat_info.st_mode)
-            try:
-                os.chown(update_filepath, stat_info.st_uid, stat_info.st_gid)
-            except AttributeError:
-                pass  # must be windows
+        new_lines.append(head + lines[linenum - 1][col:])
+        new_lines.extend(lines[linenum:])
+
+        self._lines = new_lines
+        self._stat_key = None
+        self._literals = None
+
+    def replace_baseline_repr(self, linenum, update):
+        """Replace individual baseline representation.
+
+        :param int linenum: location of baseline representation
+        :param str update: new baseline representation text (with delimiters)
+
+        """
+        self._replace_literals({linenum: update})
+
+    def _write(self, update_filepath):
+        """Write file lines to update file.
+
+        Write lines in chunks (to avoid forming the entire file content
+        in memory) with :func:`write_atomically`.
+
+        :param str update_filepath: update file path
+
+        """
+        lines = self.lines
+
+        def chunks():
+            for index in range(0, len(lines), self.WRITE_CHUNK_LINES):
+                if index:
+                    yield '\n'
+                yield '\n'.join(lines[index:index + self.WRITE_CHUNK_LINES])
+
+        write_atomically(update_filepath, chunks(), os.stat(self.path))
+
+    def update(self, report=True):
+        """Replace baseline representations previously registered for update.
+
+        :param bool report: print location of update file
+        :returns: update file path (None when in test mode)
+        :rtype: str
+
+        """
+        self._replace_literals(self.updates)
+
+        update_filepath = None
+
+        if not self.TEST_MODE:
+            update_filepath = self.update_filepath
+            makedirs(os.path.dirname(update_filepath))
+
+            self._write(update_filepath)
+
+            if report:
+                print('BASELINE UPDATE: ' + update_filepath)
 
-            print('BASELINE UPDATE: ' + update_filepath)
+        return update_filepath
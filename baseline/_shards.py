@@ -0,0 +1,360 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Coordination of baseline updates from multiple processes.
+
+When several processes (e.g. ``pytest-xdist`` workers started with
+``BASELINE_SHARD_UPDATES=YES``) compare strings against the same
+baselines, each process writes the strings compared against the
+baselines of a script to its own shard file in a directory of the run
+(under ``BASELINE_SHARD_PATH``, by default in the temporary directory,
+never beside the scripts). Then, while holding a lock on the update
+file, the process merges the shards from every process of the same run
+and writes an update file with the baselines updated for every compared
+string. (The last process to do so writes the update file reflecting
+all of them.)
+
+Processes record the strings compared against baselines of a script
+even when every string matched, so that a script updated by another
+process keeps them as alternatives. When no process of the run had a
+mismatch (so far), a process removes its shard again. (Strings of a
+process finishing before the first mismatching process are therefore
+not kept.) Shards of an update file are removed when the baseline
+command line tool processes the update file, along with shards whose
+update file no longer exists.
+
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import errno
+import glob
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from . import _script
+
+# escape glob wildcard characters in a path
+_escape = getattr(glob, 'escape', lambda path: path)
+
+# seconds to wait for lock before assuming its holder died
+LOCK_TIMEOUT = 60.0
+
+
+# identifier of this process's run when not given by the environment
+_own_run_id = None
+
+
+def run_id():
+    """Get identifier common to every process of a test run.
+
+    Processes not started by ``pytest-xdist`` belong to the same run only
+    when given the same ``BASELINE_RUN_ID``, otherwise each process is a
+    run of its own.
+
+    :returns: run identifier
+    :rtype: str
+
+    """
+    global _own_run_id
+
+    run = os.environ.get('BASELINE_RUN_ID') or os.environ.get('PYTEST_XDIST_TESTRUNUID')
+
+    if not run:
+        if _own_run_id is None:
+            # unique to this process (even for successive runs started
+            # from the same shell, i.e. with the same parent process)
+            _own_run_id = 'pid{}t{:x}'.format(os.getpid(), int(time.time() * 1e6))
+        run = _own_run_id
+
+    return run
+
+
+def worker_id():
+    """Get identifier of this process.
+
+    :returns: worker identifier
+    :rtype: str
+
+    """
+    return os.environ.get('PYTEST_XDIST_WORKER') or str(os.getpid())
+
+
+def shard_root():
+    """Get directory holding the shard files of every run.
+
+    :returns: ``BASELINE_SHARD_PATH`` or a directory (of the current
+        user) in the temporary directory
+    :rtype: str
+
+    """
+    root = os.environ.get('BASELINE_SHARD_PATH')
+
+    if not root:
+        name = 'baseline-shards'
+        if hasattr(os, 'getuid'):
+            name += '-{}'.format(os.getuid())
+        root = os.path.join(tempfile.gettempdir(), name)
+
+    return root
+
+
+def _key(update_filepath):
+    """Get shard file name prefix unique to an update file.
+
+    :param str update_filepath: update file path
+    :rtype: str
+
+    """
+    abspath = os.path.abspath(update_filepath)
+    return hashlib.sha1(abspath.encode('utf-8')).hexdigest()[:20]
+
+
+def shard_paths(update_filepath, run=None):
+    """Get paths of shard files belonging to an update file.
+
+    :param str update_filepath: update file path
+    :param str run: run identifier (None for every run)
+    :returns: shard file paths
+    :rtype: list of str
+
+    """
+    pattern = os.path.join(
+        _escape(shard_root()), _escape(run) if run else '*',
+        '{}.*.shard'.format(_key(update_filepath)))
+    return sorted(glob.glob(pattern))
+
+
+def own_shard_path(update_filepath):
+    """Get path of this process's shard file of an update file.
+
+    :param str update_filepath: update file path
+    :returns: shard file path
+    :rtype: str
+
+    """
+    return os.path.join(
+        shard_root(), run_id(), '{}.{}.shard'.format(_key(update_filepath), worker_id()))
+
+
+@contextmanager
+def lock(update_filepath, timeout=LOCK_TIMEOUT):
+    """Hold exclusive lock on update file (and its shards).
+
+    Create directory of update file when necessary.
+
+    :param str update_filepath: update file path
+    :param float timeout: seconds to wait before breaking lock
+
+    """
+    _script.makedirs(os.path.dirname(update_filepath))
+
+    root = shard_root()
+    _script.makedirs(root)
+
+    lock_path = os.path.join(root, _key(update_filepath) + '.lock')
+    deadline = time.time() + timeout
+
+    while True:
+        try:
+            handle = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+            if time.time() > deadline:
+                # holder presumed dead, break lock
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass
+                deadline = time.time() + timeout
+            time.sleep(0.01)
+        else:
+            break
+
+    try:
+        yield
+    finally:
+        os.close(handle)
+        os.remove(lock_path)
+
+
+def write(update_filepath, path, baselines, updated=True):
+    """Write this process's shard and remove shards from other runs.
+
+    Merge with previously written shard from this process (if any).
+
+    :param str update_filepath: update file path
+    :param str path: script path
+    :param dict baselines:
+        strings compared against each baseline in script
+        (key: line number, value: (indentation, set of strings))
+    :param bool updated: a string mismatched a baseline in script
+        (otherwise strings only recorded for other processes to merge)
+
+    """
+    shard_filepath = own_shard_path(update_filepath)
+
+    run_filepaths = shard_paths(update_filepath, run_id())
+    for other_filepath in shard_paths(update_filepath):
+        if other_filepath not in run_filepaths:
+            _remove(other_filepath)
+
+    if os.path.exists(shard_filepath):
+        _path, previous, previously_updated = read(shard_filepath)
+        baselines = merge([previous, baselines])
+        updated = updated or previously_updated
+
+    content = json.dumps({
+        'path': path,
+        'update': os.path.abspath(update_filepath),
+        'updated': updated,
+        'baselines': [
+            {'linenum': linenum, 'indent': indent, 'values': sorted(values)}
+            for linenum, (indent, values) in sorted(baselines.items())],
+    })
+
+    _script.makedirs(os.path.dirname(shard_filepath))
+    _script.write_atomically(shard_filepath, [content])
+
+
+def read(shard_filepath):
+    """Read shard file.
+
+    :param str shard_filepath: shard file path
+    :returns: script path, strings compared against each baseline
+        (key: line number, value: (indentation, set of strings)), and
+        whether a string mismatched a baseline
+    :rtype: tuple
+
+    """
+    with io.open(shard_filepath, 'r', encoding='utf-8') as fh:
+        content = json.loads(fh.read())
+
+    baselines = dict(
+        (entry['linenum'], (entry['indent'], set(entry['values'])))
+        for entry in content['baselines'])
+
+    return content['path'], baselines, content['updated']
+
+
+def merge(shards):
+    """Merge strings compared against baselines from several shards.
+
+    :param list shards: strings compared against each baseline
+        (key: line number, value: (indentation, set of strings))
+    :returns: merged strings compared against each baseline
+    :rtype: dict
+
+    """
+    merged = {}
+
+    for baselines in shards:
+        for linenum, (indent, values) in baselines.items():
+            try:
+                merged[linenum][1].update(values)
+            except KeyError:
+                merged[linenum] = (indent, set(values))
+
+    return merged
+
+
+def read_run(update_filepath):
+    """Read and merge shards from every process of this run.
+
+    :param str update_filepath: update file path
+    :returns: merged strings compared against each baseline
+        (key: line number, value: (indentation, set of strings)) and
+        whether a string mismatched a baseline in any process
+    :rtype: tuple
+
+    """
+    shards = [read(path) for path in shard_paths(update_filepath, run_id())]
+
+    return (merge(baselines for _path, baselines, _updated in shards),
+            any(updated for _path, _baselines, updated in shards))
+
+
+def _remove(shard_filepath):
+    """Remove shard file and its run directory (when left empty).
+
+    :param str shard_filepath: shard file path
+
+    """
+    try:
+        os.remove(shard_filepath)
+    except OSError:
+        pass
+
+    try:
+        os.rmdir(os.path.dirname(shard_filepath))
+    except OSError:
+        # other shards remain (or already removed)
+        pass
+
+
+def remove_own(update_filepath):
+    """Remove this process's shard file of an update file.
+
+    :param str update_filepath: update file path
+
+    """
+    _remove(own_shard_path(update_filepath))
+
+
+def remove(update_filepath):
+    """Remove every shard file of an update file.
+
+    :param str update_filepath: update file path
+
+    """
+    for path in shard_paths(update_filepath):
+        _remove(path)
+
+
+def remove_orphans(min_age=LOCK_TIMEOUT):
+    """Remove shard files of every run whose update file no longer exists.
+
+    :param float min_age:
+        seconds since last written before a shard file is considered
+        (leave shards of processes writing their update file alone)
+
+    """
+    pattern = os.path.join(_escape(shard_root()), '*', '*.shard')
+    cutoff = time.time() - min_age
+
+    for path in glob.glob(pattern):
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+            with io.open(path, 'r', encoding='utf-8') as fh:
+                update_filepath = json.loads(fh.read())['update']
+        except (OSError, IOError, ValueError, KeyError):
+            # removed meanwhile or unreadable
+            continue
+
+        if not os.path.exists(update_filepath):
+            _remove(path)
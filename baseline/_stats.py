@@ -0,0 +1,135 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import threading
+from collections import namedtuple
+
+# phases of baseline operations (in order of occurrence)
+PHASES = ('construct', 'transform', 'compare', 'diff', 'render', 'write')
+
+# number of call sites listed in summary (those with the most time)
+SUMMARY_SITES = 20
+
+PhaseStats = namedtuple('PhaseStats', 'count seconds')
+
+SiteStats = namedtuple('SiteStats', 'compares mismatches seconds')
+
+Snapshot = namedtuple('Snapshot', 'phases sites')
+
+
+class Stats(object):
+
+    """Counters and cumulative timers of baseline operations.
+
+    Record a count and the total time of each phase of baseline
+    operations and the number of comparisons (and mismatches) and
+    total comparison time of each baseline call site.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = None
+        self._sites = None
+        self.reset()
+
+    def reset(self):
+        """Discard recorded statistics."""
+        with self._lock:
+            self._phases = dict((phase, [0, 0.0]) for phase in PHASES)
+            self._sites = {}
+
+    def add(self, phase, seconds):
+        """Record an operation.
+
+        :param str phase: phase of operation (see PHASES)
+        :param float seconds: duration of operation
+
+        """
+        with self._lock:
+            totals = self._phases[phase]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def add_comparison(self, site, mismatch, seconds):
+        """Record a comparison against a baseline.
+
+        :param tuple site: call site (path, line number) of baseline
+        :param bool mismatch: comparison was a mismatch
+        :param float seconds: duration of comparison
+
+        """
+        with self._lock:
+            try:
+                totals = self._sites[site]
+            except KeyError:
+                totals = self._sites[site] = [0, 0, 0.0]
+            totals[0] += 1
+            totals[1] += mismatch
+            totals[2] += seconds
+
+    def snapshot(self):
+        """Get recorded statistics.
+
+        :returns: statistics of each phase (key: phase) and of each call
+            site (key: (path, line number))
+        :rtype: Snapshot
+
+        """
+        with self._lock:
+            return Snapshot(
+                dict((phase, PhaseStats(*totals)) for phase, totals in self._phases.items()),
+                dict((site, SiteStats(*totals)) for site, totals in self._sites.items()))
+
+    def summary(self, showpath=None):
+        """Format recorded statistics as text tables.
+
+        :param callable showpath: convert path for display
+        :returns: summary of each phase and of the call sites with the most time
+        :rtype: str
+
+        """
+        phases, sites = self.snapshot()
+
+        lines = ['{:<12} {:>10} {:>12}'.format('phase', 'count', 'seconds')]
+        for phase in PHASES:
+            lines.append('{:<12} {:>10} {:>12.6f}'.format(phase, *phases[phase]))
+
+        lines.append('')
+        lines.append('{:<50} {:>10} {:>10} {:>12}'.format(
+            'call site', 'compares', 'mismatches', 'seconds'))
+
+        ranked = sorted(sites.items(), key=lambda item: (-item[1].seconds, item[0]))
+        for (path, linenum), totals in ranked[:SUMMARY_SITES]:
+            location = '{}:{}'.format(showpath(path) if showpath else path, linenum)
+            lines.append('{:<50} {:>10} {:>10} {:>12.6f}'.format(location, *totals))
+
+        if len(ranked) > SUMMARY_SITES:
+            lines.append('({} more call sites)'.format(len(ranked) - SUMMARY_SITES))
+
+        return '\n'.join(lines)
+
+
+# statistics shared by every Baseline class
+STATS = Stats()
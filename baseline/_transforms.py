@@ -0,0 +1,259 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Compiled baseline comparison transforms.
+
+Support ``(pattern, replacement)`` substitutions in ``TRANSFORMS`` in
+addition to arbitrary callables. Consecutive substitutions are fused into
+a single regular expression (an alternation of the patterns) so that all
+of them are applied with a single pass over the string.
+
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import hashlib
+import re
+import sys
+from collections import OrderedDict, namedtuple
+
+# numeric back references prevent embedding a pattern in a larger pattern
+_NUMERIC_BACKREF = re.compile(r'\\[1-9]|\(\?P=\d')
+
+# flags that may be applied to part of a pattern with (?flags:...)
+_SCOPED_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x'))
+
+
+def _compile(pattern):
+    return pattern if hasattr(pattern, 'sub') else re.compile(pattern)
+
+
+def _scoped_pattern(regex):
+    """Get pattern that may be embedded in a larger pattern.
+
+    :param regex: compiled regular expression
+    :returns: pattern (None when pattern can not be embedded)
+    :rtype: str
+
+    """
+    if not isinstance(regex.pattern, type('')) or _NUMERIC_BACKREF.search(regex.pattern):
+        return None
+
+    flags = regex.flags & ~re.UNICODE
+    letters = ''
+    for flag, letter in _SCOPED_FLAGS:
+        if flags & flag:
+            letters += letter
+            flags &= ~flag
+
+    if flags:
+        return None
+
+    pattern = regex.pattern
+    if letters:
+        pattern = '(?{}:{})'.format(letters, pattern)
+
+    return pattern
+
+
+class Substitution(object):
+
+    """Regular expression substitution."""
+
+    def __init__(self, pattern, replacement):
+        self.regex = _compile(pattern)
+        self.replacement = replacement
+
+    def __call__(self, text):
+        return self.regex.sub(self.replacement, text)
+
+
+class FusedSubstitution(object):
+
+    """Several regular expression substitutions applied in one pass.
+
+    At each position in the string, the first substitution (in order)
+    whose pattern matches is applied. Unlike applying substitutions one
+    after the other, the replacement text of one substitution is not
+    subject to the substitutions that follow it.
+
+    """
+
+    def __init__(self, substitutions):
+        """Compile substitutions into single regular expression.
+
+        :param list substitutions: Substitution instances
+        :raises re.error: when patterns conflict (e.g. same group names)
+
+        """
+        self.substitutions = substitutions
+
+        self.regex = re.compile('|'.join(
+            '(?P<_baseline_{}>{})'.format(index, _scoped_pattern(substitution.regex))
+            for index, substitution in enumerate(substitutions)))
+
+        self._groups = dict(
+            ('_baseline_{}'.format(index), substitution)
+            for index, substitution in enumerate(substitutions))
+
+    def _replace(self, match):
+        substitution = self._groups[match.lastgroup]
+        replacement = substitution.replacement
+
+        if callable(replacement):
+            return replacement(substitution.regex.match(match.string, match.start()))
+
+        if '\\' in replacement:
+            return substitution.regex.match(match.string, match.start()).expand(replacement)
+
+        return replacement
+
+    def __call__(self, text):
+        return self.regex.sub(self._replace, text)
+
+
+def _fused(substitutions):
+    if len(substitutions) < 2:
+        return substitutions
+    try:
+        return [FusedSubstitution(substitutions)]
+    except re.error:
+        return substitutions
+
+
+def compile_transforms(transforms):
+    """Compile transforms into a sequence of operations.
+
+    :param transforms: callables and ``(pattern, replacement)`` pairs
+        (where pattern is a string or compiled regular expression and
+        replacement is as accepted by ``re.sub()``)
+    :returns: operations (callables accepting and returning a string)
+    :rtype: list
+
+    """
+    operations = []
+    substitutions = []
+
+    for transform in transforms:
+        if callable(transform):
+            operations.extend(_fused(substitutions))
+            substitutions = []
+            operations.append(transform)
+        else:
+            substitution = Substitution(*transform)
+
+            if _scoped_pattern(substitution.regex) is None:
+                operations.extend(_fused(substitutions))
+                substitutions = []
+                operations.append(substitution)
+            else:
+                substitutions.append(substitution)
+
+    operations.extend(_fused(substitutions))
+
+    return operations
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class TransformCache(object):
+
+    """Least recently used cache of transformed strings.
+
+    Cache results of performing transform operations on a string (keyed
+    by a digest of the string and the identity of the operations) with
+    the total size of cached results bounded.
+
+    """
+
+    def __init__(self, maxsize):
+        """Initialize cache.
+
+        :param int maxsize: maximum total size (in bytes) of cached results
+
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._currsize = 0
+        # key: (operations id, string digest), value: (operations, result, size)
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def digest(text):
+        """Get digest of string.
+
+        :param str text: string
+        :returns: digest
+        :rtype: bytes
+
+        """
+        data = text.encode('utf-8', 'surrogatepass')
+        try:
+            return hashlib.blake2b(data, digest_size=16).digest()
+        except AttributeError:  # pragma: no cover
+            return hashlib.sha1(data).digest()
+
+    def info(self):
+        """Get cache statistics.
+
+        :returns: hits, misses, maximum size, and current size
+        :rtype: CacheInfo
+
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, self._currsize)
+
+    def transform(self, operations, text):
+        """Perform operations on string (or get result from cache).
+
+        :param list operations: callables accepting and returning a string
+        :param str text: string
+        :returns: transformed string
+        :rtype: str
+
+        """
+        key = (id(operations), self.digest(text))
+
+        entry = self._entries.get(key)
+
+        # holding reference to operations in entry ensures id not reused
+        if entry is not None and entry[0] is operations:
+            # (re-insert to mark most recently used, no move_to_end() on Python 2)
+            self._entries[key] = self._entries.pop(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+
+        for operation in operations:
+            text = operation(text)
+
+        size = sys.getsizeof(text)
+
+        if size <= self.maxsize:
+            self._entries[key] = (operations, text, size)
+            self._currsize += size
+
+            while self._currsize > self.maxsize:
+                self._currsize -= self._entries.popitem(last=False)[1][2]
+
+        return text
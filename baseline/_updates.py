@@ -0,0 +1,126 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import hashlib
+import sys
+import threading
+
+
+class UpdateStore(object):
+
+    """Bounded memory set of strings compared against a baseline.
+
+    Record a digest of every distinct string added and keep the first
+    ``max_values`` distinct strings in memory. Write the remaining distinct
+    strings to a temporary file (which is read back when iterating).
+
+    Every store writes to the same temporary file (so that the number of
+    open files does not grow with the number of baselines) and records
+    the location of each of its strings within it.
+
+    """
+
+    # temporary file shared by every store (and lock serializing access
+    # to its file position)
+    _spill_file = None
+    _spill_lock = threading.Lock()
+
+    def __init__(self, max_values):
+        self.max_values = max_values
+        self._digests = set()
+        self._values = []
+        self._spill_locations = []
+
+    @staticmethod
+    def digest(text):
+        """Get digest of string.
+
+        :param str text: string
+        :returns: digest
+        :rtype: bytes
+
+        """
+        return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).digest()
+
+    def add(self, text):
+        """Add string (when not already present).
+
+        :param str text: string
+
+        """
+        digest = self.digest(text)
+
+        if digest not in self._digests:
+            self._digests.add(digest)
+
+            if len(self._values) < self.max_values:
+                self._values.append(text)
+            else:
+                self._spill(text)
+
+    def _spill(self, text):
+        data = text.encode('utf-8', 'surrogatepass')
+
+        with self._spill_lock:
+            spill_file = UpdateStore._spill_file
+            if spill_file is None:
+                import tempfile
+                spill_file = UpdateStore._spill_file = tempfile.TemporaryFile()
+
+            spill_file.seek(0, 2)
+            self._spill_locations.append((spill_file.tell(), len(data)))
+            spill_file.write(data)
+
+    @property
+    def spilled(self):
+        """Number of strings written to temporary file."""
+        return len(self._spill_locations)
+
+    @property
+    def values(self):
+        """Strings kept in memory."""
+        return list(self._values)
+
+    def __sizeof__(self):
+        # include digests and bookkeeping (but not the strings themselves)
+        return (
+            object.__sizeof__(self) + sys.getsizeof(self._digests)
+            + sum(sys.getsizeof(digest) for digest in self._digests)
+            + sys.getsizeof(self._values) + sys.getsizeof(self._spill_locations))
+
+    def __contains__(self, text):
+        return self.digest(text) in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+    def __iter__(self):
+        for text in self._values:
+            yield text
+
+        for offset, size in self._spill_locations:
+            with self._spill_lock:
+                self._spill_file.seek(offset)
+                data = self._spill_file.read(size)
+            yield data.decode('utf-8', 'surrogatepass')
@@ -0,0 +1,82 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Performance benchmarks.
+
+Each module in this package is a stand alone benchmark, run it with
+``python -m benchmarks.<module>`` from the top level directory. Run the
+suite of micro-benchmarks of the hot paths with ``python -m benchmarks``.
+
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import timeit
+import tracemalloc
+
+__all__ = ('measure', 'peak_memory', 'print_table')
+
+
+def measure(func, repeat=5):
+    """Measure execution time of a callable.
+
+    :param callable func: operation to time (called with no arguments)
+    :param int repeat: number of timing runs (best run is reported)
+    :returns: seconds per call
+    :rtype: float
+
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def peak_memory(func):
+    """Measure peak memory allocated during a call of a callable.
+
+    :param callable func: operation to measure (called with no arguments)
+    :returns: peak bytes allocated (beyond those allocated before the call)
+    :rtype: int
+
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def print_table(headers, rows):
+    """Print benchmark results as a simple text table.
+
+    :param tuple headers: column titles
+    :param list rows: column values for each row
+
+    """
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max(len(text) for text in column) for column in zip(headers, *rows)]
+    line = '  '.join('{:>%d}' % width for width in widths)
+
+    print(line.format(*headers))
+    print(line.format(*('-' * width for width in widths)))
+    for row in rows:
+        print(line.format(*row))
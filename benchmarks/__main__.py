@@ -0,0 +1,220 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Micro-benchmarks of baseline hot paths.
+
+Report operations per second and peak memory allocated by one operation
+(as measured by ``tracemalloc``) for ``Baseline()`` construction at
+varying stack depths, ``Baseline.__eq__()`` with and without
+``TRANSFORMS``, ``multiline_repr()``, ``replacement_sourcecode``,
+``Script`` baseline replacement, and ``print_diffs()``.
+
+Run with ``python -m benchmarks`` from the top level directory (use
+``--sizes`` to choose the input sizes and ``-k`` to select benchmarks).
+
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+
+from baseline import Baseline
+from baseline._baseline import RAW_STRING_SPECIAL_CHARS, multiline_repr
+from baseline._script import Script
+
+from . import measure, peak_memory, print_table
+from .callsite import _at_depth, construct
+
+# suppress update files for comparisons (and report of them at exit)
+Script.TEST_MODE = True
+
+DEPTHS = (1, 10, 100)
+
+SIZES = '1K,1M,100M'
+
+LINE = 'at 12:34:56 value = "text" \\ path\tcolumn ' + 'ś'
+
+# number of baselines in script for baseline replacement benchmark
+SCRIPT_BASELINES = 1000
+
+
+class NormalizedBaseline(Baseline):
+
+    """Baseline with times normalized."""
+
+    TRANSFORMS = [(r'\d\d:\d\d:\d\d', 'HH:MM:SS')]
+
+
+def parse_size(text):
+    """Convert size with optional K or M suffix to number of characters."""
+    multiplier = {'K': 1024, 'M': 1024 ** 2}.get(text[-1:].upper(), 1)
+    return int(text.rstrip('kKmM')) * multiplier
+
+
+def make_text(size):
+    """Make multi-line text of approximately ``size`` characters."""
+    count = max(size // (len(LINE) + 1), 1)
+    return '\n'.join([LINE] * count)
+
+
+def make_baseline(cls, text):
+    """Make baseline from same call site with different text."""
+    # forget previous instance made here (different text not allowed)
+    Baseline._all_instances.clear()
+    Baseline._call_sites.clear()
+    return cls('\n' + text + '\n')
+
+
+def bench_construct(sizes):
+    for depth in DEPTHS:
+        yield 'Baseline() depth {}'.format(depth), construct, depth
+
+
+def bench_eq(sizes):
+    for label, size in sizes:
+        text = make_text(size)
+
+        expected = make_baseline(Baseline, text)
+        other = str(expected)
+        yield '__eq__ {}'.format(label), lambda: expected == other, 1
+
+        expected = make_baseline(NormalizedBaseline, text.replace('12:34:56', 'HH:MM:SS'))
+        yield '__eq__ TRANSFORMS {}'.format(label), lambda: expected == text, 1
+
+    Baseline._all_instances.clear()
+    Baseline._call_sites.clear()
+
+
+def bench_multiline_repr(sizes):
+    for label, size in sizes:
+        text = make_text(size)
+        yield 'multiline_repr {}'.format(label), lambda: multiline_repr(text), 1
+        yield 'multiline_repr raw {}'.format(label), (
+            lambda: multiline_repr(text, RAW_STRING_SPECIAL_CHARS)), 1
+
+
+def bench_replacement_sourcecode(sizes):
+    for label, size in sizes:
+        expected = make_baseline(Baseline, 'EXPECTED')
+        expected._updates = set(
+            make_text(size // 10) + str(index) for index in range(10))
+
+        yield 'replacement_sourcecode 10 x {}/10'.format(label), (
+            lambda: expected.replacement_sourcecode), 1
+
+    Baseline._all_instances.clear()
+    Baseline._call_sites.clear()
+
+
+def bench_script(sizes):
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, 'script.py')
+
+    with io.open(path, 'w', encoding='utf-8') as handle:
+        handle.write('from baseline import Baseline\n')
+        for index in range(SCRIPT_BASELINES):
+            handle.write('\nvalue{} = Baseline("""\n    VALUE {}\n    """)\n'.format(
+                index, index))
+
+    linenums = [3 + 4 * index for index in range(SCRIPT_BASELINES)]
+
+    def update():
+        script = Script(path)
+        for linenum in linenums:
+            script.add_update(linenum, '"""\n    UPDATED {}\n    """'.format(linenum))
+        script.update(report=False)
+
+    try:
+        yield 'Script.update() {} baselines'.format(SCRIPT_BASELINES), update, 1
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def bench_print_diffs(sizes):
+    for label, size in sizes:
+        text = make_text(size)
+        lines = text.split('\n')
+        for index in (len(lines) // 4, len(lines) // 2, len(lines) * 3 // 4):
+            lines[index] = 'CHANGED'
+        other = '\n'.join(lines)
+
+        expected = make_baseline(Baseline, text)
+
+        def print_diffs():
+            with redirect_stdout(io.StringIO()):
+                expected.print_diffs(other)
+
+        yield 'print_diffs {}'.format(label), print_diffs, 1
+
+    Baseline._all_instances.clear()
+    Baseline._call_sites.clear()
+
+
+BENCHMARKS = (
+    bench_construct,
+    bench_eq,
+    bench_multiline_repr,
+    bench_replacement_sourcecode,
+    bench_script,
+    bench_print_diffs,
+)
+
+
+def run(func):
+    """Measure operations per second and peak memory of one operation."""
+    return 1 / measure(func, repeat=3), peak_memory(func)
+
+
+def main(args=None):
+    parser = ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--sizes', default=SIZES,
+        help='comma separated input sizes (K and M suffixes allowed, '
+             'default: {})'.format(SIZES))
+    parser.add_argument(
+        '-k', dest='keyword', default='',
+        help='only run benchmarks with names containing this text')
+    args = parser.parse_args(args)
+
+    sizes = [(label, parse_size(label)) for label in args.sizes.split(',')]
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), max(DEPTHS) + 100))
+
+    rows = []
+    for benchmark in BENCHMARKS:
+        for name, func, depth in benchmark(sizes):
+            if args.keyword not in name:
+                continue
+
+            ops, peak = _at_depth(depth, lambda: run(func))
+            rows.append((name, '{:.1f}'.format(ops), '{:.1f}'.format(peak / 1024)))
+
+    print_table(('benchmark', 'ops/sec', 'peak KiB'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Benchmark baseline call site resolution at varying stack depths.
+
+Compare the cost of constructing a ``Baseline`` (which resolves the file
+and line number of its caller) against the cost of building a full stack
+record with ``inspect.getouterframes()`` at the same stack depth. The cost
+of ``Baseline`` construction must not grow with the stack depth.
+
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import inspect
+import sys
+
+from baseline import Baseline
+
+from . import measure, print_table
+
+DEPTHS = (1, 10, 100, 500)
+
+
+def _at_depth(depth, func):
+    """Call function with ``depth`` additional frames on the stack."""
+    if depth > 1:
+        return _at_depth(depth - 1, func)
+    return func()
+
+
+def construct():
+    return Baseline("""BENCHMARK""")
+
+
+def outerframes():
+    return inspect.getouterframes(inspect.currentframe())[1]
+
+
+def main():
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), max(DEPTHS) + 100))
+
+    rows = []
+    for depth in DEPTHS:
+        baseline_time = _at_depth(depth, lambda: measure(construct))
+        inspect_time = _at_depth(depth, lambda: measure(outerframes))
+        rows.append((
+            depth,
+            '{:.2f}'.format(baseline_time * 1e6),
+            '{:.2f}'.format(inspect_time * 1e6)))
+
+    print_table(('stack depth', 'Baseline() usec', 'getouterframes() usec'), rows)
+
+    shallow, deep = float(rows[0][1]), float(rows[-1][1])
+    print()
+    print('Baseline() cost ratio (depth {} / depth {}): {:.2f}'.format(
+        DEPTHS[-1], DEPTHS[0], deep / shallow))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Benchmark baseline update file search on a synthetic directory tree.
+
+Generate a tree of test packages alongside directories that normally
+hold no test scripts (version control, dependencies, virtual environment)
+and time ``locate_updates()`` with and without directory pruning.
+
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+
+from baseline.__main__ import locate_updates
+
+from . import measure, print_table
+
+PACKAGES = 20  # number of test packages
+DEPTH = 6  # levels of subdirectories in each package (and pruned tree)
+FILES = 10  # files per directory
+
+
+def make_tree(root, depth, files, update=False):
+    dirpath = root
+    for level in range(depth):
+        dirpath = os.path.join(dirpath, 'level{}'.format(level))
+        os.makedirs(dirpath)
+        for index in range(files):
+            with open(os.path.join(dirpath, 'test_{}.py'.format(index)), 'w') as fh:
+                fh.write('')
+        if update:
+            with open(os.path.join(dirpath, 'test_0.py.update'), 'w') as fh:
+                fh.write('')
+
+
+def main():
+    top = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        for package in range(PACKAGES):
+            make_tree(os.path.join(top, 'tests', 'pkg{}'.format(package)), DEPTH, FILES, True)
+            for pruned in ('.git', 'node_modules', '.tox', 'venv'):
+                make_tree(os.path.join(top, pruned, 'pkg{}'.format(package)), DEPTH, FILES)
+
+        os.chdir(top)
+
+        rows = []
+        for prune in (False, True):
+            for jobs in (1, 4):
+                found = len(locate_updates(['.'], jobs=jobs, prune=prune))
+                seconds = measure(
+                    lambda: locate_updates(['.'], jobs=jobs, prune=prune), repeat=3)
+                rows.append((prune, jobs, found, '{:.2f}'.format(seconds * 1e3)))
+
+        print_table(('prune', 'jobs', 'updates found', 'msec'), rows)
+
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(top)
+
+
+if __name__ == '__main__':
+    main()
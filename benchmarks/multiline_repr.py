@@ -0,0 +1,77 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Benchmark ``multiline_repr()`` on large inputs.
+
+Compare against the original implementation (which split the text on one
+special character at a time and represented each fragment on its own) and
+check the representations are identical.
+
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from baseline._baseline import RAW_STRING_SPECIAL_CHARS, multiline_repr
+
+from . import measure, print_table
+
+SIZES = (10 ** 4, 10 ** 6, 10 ** 7)
+
+LINE = 'value = "text" \\ path\tcolumn ' + 'ś' + '\n'
+
+
+def split_repr(text, special_chars=('\n', '"')):
+    """Original recursive implementation."""
+    try:
+        char = special_chars[0]
+    except IndexError:
+        text = ascii(text)[1:-1]
+    else:
+        text = char.join(
+            split_repr(s, special_chars[1:]) for s in text.split(char))
+
+    return text
+
+
+def main():
+    rows = []
+    for size in SIZES:
+        text = (LINE * (size // len(LINE) + 1))[:size]
+
+        for special_chars in (('\n', '"'), RAW_STRING_SPECIAL_CHARS):
+            assert multiline_repr(text, special_chars) == split_repr(text, special_chars)
+
+            new_time = measure(lambda: multiline_repr(text, special_chars), repeat=3)
+            old_time = measure(lambda: split_repr(text, special_chars), repeat=3)
+
+            rows.append((
+                size,
+                len(special_chars),
+                '{:.3f}'.format(new_time * 1e3),
+                '{:.3f}'.format(old_time * 1e3),
+                '{:.1f}x'.format(old_time / new_time)))
+
+    print_table(
+        ('chars', 'special chars', 'single pass msec', 'recursive msec', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
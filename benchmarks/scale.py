@@ -0,0 +1,199 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+"""Benchmark the whole baseline update cycle on a synthetic test tree.
+
+Generate test modules with baselines in each (of several sizes and at
+several indentation levels, see ``tests/indents.py``) where a fraction of
+the comparisons mismatch. Run them in a separate interpreter and time
+the comparisons and the creation of the update files (the
+``_atexit_callback()`` flush). Then time the search for update files and
+``python -m baseline --force`` applying them.
+
+Run with ``python -m benchmarks.scale`` from the top level directory (see
+``--help`` for options). Time per baseline should stay flat as the number
+of modules grows.
+
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+
+from baseline.__main__ import locate_updates, main as baseline_main
+
+from . import print_table
+
+TOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNNER = '''
+import importlib, json, os, sys, time
+from baseline import Baseline
+
+names = sorted(name[:-3] for name in os.listdir('tests') if name.endswith('.py'))
+sys.path.insert(0, 'tests')
+
+start = time.perf_counter()
+results = [importlib.import_module(name).check() for name in names]
+compare = time.perf_counter() - start
+
+start = time.perf_counter()
+Baseline._atexit_callback()
+flush = time.perf_counter() - start
+
+# already written
+Baseline._baselines_to_update.clear()
+
+print(json.dumps({
+    'compare': compare,
+    'flush': flush,
+    'mismatches': sum(result.count(False) for result in results),
+}))
+'''
+
+
+def baseline_source(index, lines, indent):
+    """Make source of a baseline (returned by a function) at an indentation."""
+    text = '\n'.join('line {} of baseline {}'.format(line, index) for line in range(lines))
+    body = ''.join(' ' * indent + line + '\n' for line in text.split('\n'))
+    source = 'Baseline("""\n{}{}""")'.format(body, ' ' * indent)
+
+    if indent == 0:
+        return 'expected{} = {}\n\ndef baseline{}():\n    return expected{}\n'.format(
+            index, source, index, index), text
+    if indent == 4:
+        return 'def baseline{}():\n    return {}\n'.format(index, source), text
+    return 'class Holder{}:\n    def baseline(self):\n        return {}\n\n' \
+        'baseline{} = Holder{}().baseline\n'.format(index, source, index, index), text
+
+
+def make_module(path, baselines, lines, mismatch_ratio, first_index):
+    """Write test module with baselines and a check() of each."""
+    parts = ['from baseline import Baseline\n']
+    checks = []
+
+    for offset in range(baselines):
+        index = first_index + offset
+        # alternate indentation and vary literal size
+        source, text = baseline_source(index, 1 + lines * (offset % 3), 4 * (offset % 3))
+        parts.append(source)
+
+        # spread mismatches evenly across every baseline of the tree
+        if int((index + 1) * mismatch_ratio) > int(index * mismatch_ratio):
+            text += '\nchanged'
+        checks.append('baseline{}() == {!r}'.format(index, text))
+
+    parts.append('def check():\n    return [\n{}    ]\n'.format(
+        ''.join('        {},\n'.format(check) for check in checks)))
+
+    with io.open(path, 'w', encoding='utf-8') as handle:
+        handle.write('\n\n'.join(parts))
+
+
+def run_cycle(modules, baselines, lines, mismatch_ratio):
+    """Generate tree, run it, and apply its updates.
+
+    :returns: timings (in seconds) and counts
+    :rtype: dict
+
+    """
+    top = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        os.makedirs(os.path.join(top, 'tests'))
+        for module in range(modules):
+            make_module(
+                os.path.join(top, 'tests', 'test_{}.py'.format(module)),
+                baselines, lines, mismatch_ratio, module * baselines)
+
+        with io.open(os.path.join(top, 'runner.py'), 'w', encoding='utf-8') as handle:
+            handle.write(RUNNER)
+
+        env = dict(os.environ, PYTHONPATH=TOP_DIR, PYTHONDONTWRITEBYTECODE='1')
+        output = subprocess.check_output([sys.executable, 'runner.py'], cwd=top, env=env)
+        results = json.loads(output.decode('utf-8').strip().split('\n')[-1])
+
+        os.chdir(top)
+
+        start = time.perf_counter()
+        results['updates'] = len(locate_updates(['.']))
+        results['discover'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            baseline_main(['--force'])
+        results['apply'] = time.perf_counter() - start
+
+        return results
+
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(top)
+
+
+def main(args=None):
+    parser = ArgumentParser(prog='python -m benchmarks.scale', description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--modules', default='10,100,500',
+        help='comma separated numbers of test modules (default: 10,100,500)')
+    parser.add_argument(
+        '--baselines', type=int, default=20,
+        help='baselines per test module (default: 20)')
+    parser.add_argument(
+        '--lines', type=int, default=5,
+        help='lines added to each successive literal size (default: 5)')
+    parser.add_argument(
+        '--mismatch-ratio', type=float, default=0.1,
+        help='fraction of comparisons that mismatch (default: 0.1)')
+    args = parser.parse_args(args)
+
+    rows = []
+    for modules in [int(count) for count in args.modules.split(',')]:
+        results = run_cycle(modules, args.baselines, args.lines, args.mismatch_ratio)
+        total = modules * args.baselines
+        rows.append((
+            modules,
+            total,
+            results['mismatches'],
+            results['updates'],
+            '{:.3f}'.format(results['compare']),
+            '{:.3f}'.format(results['flush']),
+            '{:.3f}'.format(results['discover']),
+            '{:.3f}'.format(results['apply']),
+            '{:.1f}'.format(
+                (results['flush'] + results['apply']) / max(results['mismatches'], 1) * 1e6)))
+
+    print_table(
+        ('modules', 'baselines', 'mismatches', 'update files', 'compare sec',
+         'flush sec', 'discover sec', 'apply sec', 'usec/mismatch'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -26,12 +26,22 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import atexit
 import difflib
 import io
+import multiprocessing.pool  # registers its own exit function (before atexit mocked)
 import os
+import pstats
+import re
+import shutil
+import sys
+import tempfile
+import tracemalloc
 from unittest import TestCase
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import baseline
 from baseline import Baseline
+from baseline._stats import PHASES
+from baseline._transforms import TransformCache, compile_transforms
+from baseline._updates import UpdateStore
 
 from . import endswith
 from . import indents
@@ -71,10 +81,12 @@ class BaseTestCase(TestCase):
          """
         # clear out record of which baseline instances had a mis-compare
         Baseline._baselines_to_update = set()
+        Baseline._compared_baselines = set()
 
         # for each baseline instance, clear out cache of previous comparisons
         for baseline_instance in Baseline._all_instances.values():
             baseline_instance._updates = set()
+            baseline_instance._matches = 0
 
     def check_updated_files(self, module_ops=None):
         """Check pending file edits match expectations.
@@ -190,6 +202,48 @@ class NormalUse(BaseTestCase):
         self.check_updated_files(expected_updates)
 
 
+class ParallelUpdates(BaseTestCase):
+
+    """Test update files generated by multiple threads."""
+
+    def setUp(self):
+        super(ParallelUpdates, self).setUp()
+        Baseline.UPDATE_WORKERS = 3
+
+    def tearDown(self):
+        Baseline.UPDATE_WORKERS = 1
+        super(ParallelUpdates, self).tearDown()
+
+    def test_update(self):
+        """Test every script updated when updates are generated concurrently."""
+        self.assertNotEqual(simple.single, 'SINGLE+')
+        self.assertNotEqual(indents.indent0, Indents.sample_update)
+        self.assertNotEqual(indents.indent4, Indents.sample_update)
+        self.assertNotEqual(raw.missing, 'MISSING+')
+        self.assertNotEqual(endswith.quote, 'ENDSWITH+ "')
+
+        self.check_updated_files({
+            simple: [('SINGLE', 'SINGLE+')],
+            indents: [('line=', 'line+=')],
+            raw: [('MISSING', 'MISSING+')],
+            endswith: [('ENDSWITH "', 'ENDSWITH+ "')],
+        })
+
+    def test_no_threads(self):
+        """Test scripts updated one at a time when threads cannot start."""
+        self.assertNotEqual(simple.single, 'SINGLE+')
+        self.assertNotEqual(raw.missing, 'MISSING+')
+
+        error = RuntimeError("can't create new thread at interpreter shutdown")
+        with patch('multiprocessing.pool.ThreadPool', side_effect=error) as pool_mock:
+            self.check_updated_files({
+                simple: [('SINGLE', 'SINGLE+')],
+                raw: [('MISSING', 'MISSING+')],
+            })
+
+        pool_mock.assert_called_once_with(2)
+
+
 class MultipleCompares(BaseTestCase):
 
     """Test behavior of baseline when it is used more than once."""
@@ -238,6 +292,425 @@ class MultipleCompares(BaseTestCase):
         self.check_updated_files()
 
 
+class BoundedUpdates(BaseTestCase):
+
+    """Test compared strings kept in bounded memory."""
+
+    def test_store_selected(self):
+        """Test instances use bounded store when limit configured."""
+        Baseline.MAX_UPDATES_IN_MEMORY = 2
+        try:
+            instance = Baseline("""BOUNDED""")
+        finally:
+            Baseline.MAX_UPDATES_IN_MEMORY = None
+
+        self.assertIsInstance(instance._updates, UpdateStore)
+        self.assertEqual(instance._updates.max_values, 2)
+
+    def test_spilled_updates(self):
+        """Test strings beyond limit are spilled and still used for update.
+
+         Check only first string kept in memory, that the others were
+         written to the temporary file, and that the update to the baseline
+         includes every distinct version of the string.
+
+         """
+        simple.single._updates = UpdateStore(1)
+
+        self.assertEqual(simple.single, 'SINGLE')
+        self.assertNotEqual(simple.single, 'SINGLE+')
+        self.assertNotEqual(simple.single, 'SINGLE+')
+        self.assertNotEqual(simple.single, 'SINGLE++')
+
+        self.assertEqual(len(simple.single._updates), 3)
+        self.assertEqual(simple.single._updates.spilled, 2)
+
+        replacement = '\n' + '\n'.join([
+            '######################' * 5,
+            '# Baseline Alternative 1',
+            '######################' * 5,
+            'SINGLE',
+            '######################' * 5,
+            '# Baseline Alternative 2',
+            '######################' * 5,
+            'SINGLE+',
+            '######################' * 5,
+            '# Baseline Alternative 3',
+            '######################' * 5,
+            'SINGLE++',
+            '""")'
+        ])
+
+        self.check_updated_files({simple: [('SINGLE""")', replacement)]})
+
+    def test_shared_spill_file(self):
+        """Test many spilling stores share a single temporary file."""
+        UpdateStore(0).add('')  # (temporary file created on first spill)
+
+        with patch('tempfile.TemporaryFile') as temporary_file_mock:
+            stores = [UpdateStore(1) for _ in range(600)]
+            for index, store in enumerate(stores):
+                for version in range(3):
+                    store.add('{} {}'.format(index, version))
+
+        temporary_file_mock.assert_not_called()
+        self.assertEqual(
+            [list(store) for store in stores[::100]],
+            [['{} {}'.format(index, version) for version in range(3)]
+             for index in range(0, 600, 100)])
+
+
+class DeferredUpdates(BaseTestCase):
+
+    """Test matching strings are not retained when updates deferred."""
+
+    def setUp(self):
+        super(DeferredUpdates, self).setUp()
+        Baseline.DEFER_UPDATES = True
+
+    def tearDown(self):
+        Baseline.DEFER_UPDATES = False
+        super(DeferredUpdates, self).tearDown()
+
+    def test_all_equal(self):
+        """Test matching comparisons only counted.
+
+        Check no strings retained, that no "atexit" activity was
+        registered, and that no files were updated.
+
+        """
+        self.assertEqual(simple.single, 'SINGLE')
+        self.assertEqual(simple.single, 'SINGLE')
+
+        self.assertEqual(simple.single._matches, 2)
+        self.assertEqual(len(simple.single._updates), 0)
+        self.check_updated_files()
+
+    def test_two_dissimiliar(self):
+        """Test update includes baseline value when a comparison matched.
+
+         Check only mismatching string retained and update to baseline
+         includes both versions of the string.
+
+         """
+        self.assertEqual(simple.single, 'SINGLE')
+        self.assertNotEqual(simple.single, 'SINGLE+')
+
+        self.assertEqual(sorted(simple.single._updates), ['SINGLE+'])
+
+        replacement = '\n' + '\n'.join([
+            '######################' * 5,
+            '# Baseline Alternative 1',
+            '######################' * 5,
+            'SINGLE',
+            '######################' * 5,
+            '# Baseline Alternative 2',
+            '######################' * 5,
+            'SINGLE+',
+            '""")'
+        ])
+
+        self.check_updated_files({simple: [('SINGLE""")', replacement)]})
+
+
+class Transforms(BaseTestCase):
+
+    """Test transforms performed on strings before comparison."""
+
+    class NormalizedBaseline(Baseline):
+
+        """Baseline with substitutions and callable transforms."""
+
+        TRANSFORMS = [
+            (r'\d\d:\d\d:\d\d', 'HH:MM:SS'),
+            (re.compile('0X[0-9A-F]+', re.IGNORECASE), '0xADDR'),
+            (r'(?P<user>\w+)@(\w+)', r'\2 at \g<user>'),
+            (r'(.)\1{3,}', lambda match: match.group(1) * 3),
+            str.strip,
+            ('ADDR', lambda match: match.group().lower()),
+        ]
+
+    def test_compare(self):
+        """Test substitutions and callables applied in order."""
+        expected = self.NormalizedBaseline("""
+            at HH:MM:SS 0xaddr
+            host at user ...
+            """)
+
+        self.assertEqual(expected, '  at 12:34:56 0x7FfE\nuser@host .....\n ')
+        self.check_updated_files()
+
+    def test_fused(self):
+        """Test consecutive embeddable substitutions fused together."""
+        operations = compile_transforms(self.NormalizedBaseline.TRANSFORMS)
+
+        self.assertEqual(
+            [type(operation).__name__ for operation in operations],
+            ['FusedSubstitution', 'Substitution', 'method_descriptor', 'Substitution'])
+        self.assertEqual(len(operations[0].substitutions), 3)
+
+    def test_one_pass(self):
+        """Test replacement text not subject to following substitutions."""
+        operations = compile_transforms([('a', 'b'), ('b', 'c')])
+
+        self.assertEqual(operations[0]('ab'), 'bc')
+
+    def test_recompiled(self):
+        """Test transforms recompiled when changed."""
+        class ChangingBaseline(Baseline):
+            TRANSFORMS = [('a', 'b')]
+
+        operations = ChangingBaseline._transform_operations()
+        self.assertIs(ChangingBaseline._transform_operations(), operations)
+
+        ChangingBaseline.TRANSFORMS.append(('c', 'd'))
+        self.assertIsNot(ChangingBaseline._transform_operations(), operations)
+        self.assertEqual(Baseline._transform_operations(), [])
+
+
+class PrintDiffs(BaseTestCase):
+
+    """Test differences printed upon mis-compare."""
+
+    def setUp(self):
+        super(PrintDiffs, self).setUp()
+        Baseline.PRINT_DIFFS = True
+
+    def tearDown(self):
+        Baseline.PRINT_DIFFS = False
+        Baseline.PRINT_DIFFS_MAX_HUNKS = None
+        Baseline.PRINT_DIFFS_MAX_LINES = None
+        super(PrintDiffs, self).tearDown()
+
+    def compare(self, text):
+        expected = Baseline("""
+            LINE 1
+            LINE 2
+            LINE 3
+            LINE 4
+            LINE 5
+            LINE 6
+            LINE 7
+            LINE 8
+            LINE 9
+            """)
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertNotEqual(expected, text)
+        return stdout.getvalue()
+
+    def test_print(self):
+        """Test context differences printed."""
+        output = self.compare(
+            'LINE 1\nLINE 2\nLINE 3\nLINE 4\n'
+            'LINE 5+\nLINE 6\nLINE 7\nLINE 8\nLINE 9')
+
+        self.assertEqual(output, '\n'.join([
+            '*** ',
+            '--- ',
+            '***************',
+            '*** 2,8 ****',
+            '  LINE 2\n  LINE 3\n  LINE 4',
+            '! LINE 5',
+            '  LINE 6\n  LINE 7\n  LINE 8',
+            '--- 2,8 ----',
+            '  LINE 2\n  LINE 3\n  LINE 4',
+            '! LINE 5+',
+            '  LINE 6\n  LINE 7\n  LINE 8',
+            '']))
+
+    def test_max_hunks(self):
+        """Test printed differences limited to maximum number of hunks."""
+        Baseline.PRINT_DIFFS_MAX_HUNKS = 1
+
+        output = self.compare(
+            'LINE 1+\nLINE 2\nLINE 3\nLINE 4\n'
+            'LINE 5\nLINE 6\nLINE 7\nLINE 8\nLINE 9+')
+
+        self.assertNotIn('LINE 9+', output)
+        self.assertTrue(output.endswith('*** (further differences not shown) ***\n'))
+
+    def test_max_lines(self):
+        """Test printed differences limited to maximum number of lines."""
+        Baseline.PRINT_DIFFS_MAX_LINES = 5
+
+        output = self.compare(
+            'LINE 1\nLINE 2\nLINE 3\nLINE 4\n'
+            'LINE 5+\nLINE 6\nLINE 7\nLINE 8\nLINE 9')
+
+        self.assertEqual(output.split('\n')[5:], [
+            '***************', '*** (further differences not shown) ***', ''])
+
+
+class Statistics(BaseTestCase):
+
+    """Test counts and times of baseline operations."""
+
+    def setUp(self):
+        super(Statistics, self).setUp()
+        Baseline.STATS = True
+        Baseline.stats(reset=True)
+
+    def tearDown(self):
+        Baseline.STATS = False
+        Baseline.PROFILE_PATH = None
+        Baseline.stats(reset=True)
+        super(Statistics, self).tearDown()
+
+    def test_phases(self):
+        """Test count of each phase and of each call site."""
+        for _ in range(3):
+            self.assertNotEqual(simple.single, 'SINGLE+')
+
+        self.check_updated_files({simple: [('SINGLE', 'SINGLE+')]})
+
+        phases, sites = Baseline.stats()
+
+        self.assertEqual(
+            dict((phase, totals.count) for phase, totals in phases.items()),
+            {'construct': 0, 'transform': 0, 'compare': 3, 'diff': 0, 'render': 1, 'write': 1})
+        self.assertGreater(phases['compare'].seconds, 0)
+
+        site = (os.path.abspath(simple.__file__).replace('.pyc', '.py'), simple.single._linenum)
+        self.assertEqual(sites[site][:2], (3, 3))
+
+    def test_summary(self):
+        """Test summary lists each phase and call site."""
+        self.assertEqual(simple.single, 'SINGLE')
+
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            Baseline._print_stats()
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], 'BASELINE STATS:')
+        self.assertEqual([line.split()[0] for line in lines[2:8]], list(PHASES))
+        self.assertIn('simple.py:{} '.format(simple.single._linenum), lines[-1])
+
+    def test_reset(self):
+        """Test statistics discarded."""
+        self.assertEqual(simple.single, 'SINGLE')
+
+        self.assertEqual(Baseline.stats(reset=True).phases['compare'].count, 1)
+        self.assertEqual(Baseline.stats().phases['compare'].count, 0)
+
+    def test_profile(self):
+        """Test profile of update file creation written."""
+        profile_dirpath = tempfile.mkdtemp()
+        Baseline.PROFILE_PATH = os.path.join(profile_dirpath, 'baseline.prof')
+
+        try:
+            self.assertNotEqual(simple.single, 'SINGLE+')
+            self.check_updated_files({simple: [('SINGLE', 'SINGLE+')]})
+
+            stats = pstats.Stats(Baseline.PROFILE_PATH)
+            self.assertTrue(any(
+                function[2] == '_update_scripts' for function in stats.stats))
+        finally:
+            shutil.rmtree(profile_dirpath)
+
+
+class MemoryReport(BaseTestCase):
+
+    """Test report of memory retained by baselines."""
+
+    def entry(self, baseline_instance):
+        return next(
+            entry for entry in Baseline.memory_report()
+            if entry.path == baseline_instance._path
+            and entry.linenum == baseline_instance._linenum)
+
+    def test_retained(self):
+        """Test count and size of compared strings kept in memory."""
+        texts = ['A' * 1000, 'B' * 2000]
+        for text in texts:
+            self.assertNotEqual(simple.single, text)
+
+        entry = self.entry(simple.single)
+
+        self.assertEqual((entry.values, entry.spilled, entry.allocated), (2, 0, None))
+        self.assertGreater(entry.size, sum(sys.getsizeof(text) for text in texts))
+        self.assertEqual(Baseline.memory_report()[0], entry)
+
+    def test_spilled(self):
+        """Test strings written to temporary file not counted as in memory."""
+        simple.single._updates = UpdateStore(1)
+        for text in ['A' * 1000, 'B' * 2000]:
+            self.assertNotEqual(simple.single, text)
+
+        entry = self.entry(simple.single)
+
+        self.assertEqual((entry.values, entry.spilled), (1, 1))
+
+    def test_allocated(self):
+        """Test location of largest string allocation when tracing."""
+        tracemalloc.start()
+        try:
+            self.assertNotEqual(simple.single, 'SINGLE' + '+' * 1000)
+            self.assertNotEqual(simple.single, 'SINGLE' * 1000)
+            linenum = sys._getframe().f_lineno - 1
+            entry = self.entry(simple.single)
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(entry.allocated, '{}:{}'.format(__file__, linenum))
+
+    def test_format(self):
+        """Test report table."""
+        self.assertNotEqual(simple.single, 'SINGLE+')
+
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            Baseline._print_memory_report()
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], 'BASELINE MEMORY:')
+        self.assertTrue(lines[1].startswith('baseline '))
+        self.assertTrue(lines[-1].startswith('total: '))
+
+
+class TransformCaching(BaseTestCase):
+
+    """Test cache of transformed strings."""
+
+    def setUp(self):
+        super(TransformCaching, self).setUp()
+        Baseline.TRANSFORM_CACHE_SIZE = 10 ** 6
+        Baseline._transform_cache = None
+
+    def tearDown(self):
+        Baseline.TRANSFORM_CACHE_SIZE = 0
+        Baseline._transform_cache = None
+        super(TransformCaching, self).tearDown()
+
+    def test_hits(self):
+        """Test repeated comparisons of same string use cached transform."""
+        expected = Transforms.NormalizedBaseline("""at HH:MM:SS""")
+
+        for _ in range(3):
+            self.assertEqual(expected, 'at 12:34:56')
+
+        info = Baseline.transform_cache_info()
+        self.assertEqual((info.hits, info.misses, info.maxsize), (2, 1, 10 ** 6))
+        self.assertGreater(info.currsize, 0)
+
+    def test_bounded(self):
+        """Test least recently used results evicted to bound total size."""
+        operations = [str.upper]
+        cache = TransformCache(sys.getsizeof('X' * 100) * 2)
+
+        for text in ['a' * 100, 'b' * 100, 'a' * 100, 'c' * 100, 'b' * 100]:
+            self.assertEqual(cache.transform(operations, text), text.upper())
+
+        self.assertEqual(cache.info()[:2], (1, 4))
+        self.assertLessEqual(cache.info().currsize, cache.maxsize)
+
+    def test_operations_identity(self):
+        """Test results of other operations not used."""
+        cache = TransformCache(10 ** 6)
+
+        self.assertEqual(cache.transform([str.upper], 'abc'), 'ABC')
+        self.assertEqual(cache.transform([str.title], 'abc'), 'Abc')
+        self.assertEqual(cache.info().misses, 2)
+
+
 class BaselineSingleton(BaseTestCase):
 
     """Test two baseline instantiations at same line result in same instance.
@@ -279,6 +752,70 @@ class BaselineSingleton(BaseTestCase):
             str(trap.exception), 'varying baseline text not allowed')
 
 
+class CallSite(BaseTestCase):
+
+    """Test source code location recorded for each baseline instance."""
+
+    def test_location(self):
+        """Test path and line number of instantiation are recorded.
+
+        Check location is that of the code instantiating the baseline
+        even when instantiated within nested function calls.
+
+        """
+        def nested(depth):
+            if depth:
+                return nested(depth - 1)
+            return Baseline("""CALLSITE"""), sys._getframe().f_lineno
+
+        instance, linenum = nested(20)
+
+        self.assertEqual(instance._path, os.path.abspath(__file__).replace('.pyc', '.py'))
+        self.assertEqual(instance._linenum, linenum)
+
+    def test_repeated_call_site(self):
+        """Test repeated instantiation from the same call site.
+
+        Check same instance returned for every iteration and that the
+        call site was only recorded once.
+
+        """
+        instances = []
+        for _ in range(3):
+            instances.append(Baseline("""REPEATED"""))
+            if len(instances) == 1:
+                count = len(Baseline._call_sites)
+
+        self.assertEqual(len(Baseline._call_sites), count)
+        self.assertTrue(all(instance is instances[0] for instance in instances))
+
+    def test_call_sites_forgotten(self):
+        """Test call sites discarded with source and when instance discarded."""
+        def construct():
+            return Baseline("""FORGOTTEN""")
+
+        instance = construct()
+        path = instance._path
+
+        Baseline.invalidate_sources(path)
+
+        self.assertFalse(any(
+            baseline._path == path for _, _, baseline in Baseline._call_sites.values()))
+        self.assertIs(construct(), instance)
+
+        del Baseline._all_instances[(path, instance._linenum)]
+
+        self.assertIsNot(construct(), instance)
+
+    def test_equivalent_text(self):
+        """Test differing text with same dedented value at same call site."""
+        texts = ['\n    EQUIVALENT\n    ', '\n  EQUIVALENT\n  ']
+        baseline1, baseline2 = [Baseline(text) for text in texts]
+
+        self.assertIs(baseline1, baseline2)
+        self.assertEqual(baseline1, 'EQUIVALENT')
+
+
 class IllegalBaselines(BaseTestCase):
 
     """Test illegal baseline value formats."""
@@ -301,6 +838,32 @@ class IllegalBaselines(BaseTestCase):
 
         self.check_updated_files()
 
+    def test_both_quote_styles_matched(self):
+        """Verify quote styles of matching string checked upon update.
+
+         Check that no exception is raised while comparisons match
+         and that it is raised once the baseline mis-compares.
+
+        """
+        both_styles = Baseline('"""' + "'''")
+        self.assertEqual(both_styles, '"""' + "'''")
+
+        with self.assertRaises(ValueError):
+            self.assertNotEqual(both_styles, 'MISMATCH')
+
+    def test_not_a_string(self):
+        """Verify exception when compared against something other than a string.
+
+         Check that exception is raised and that nothing was recorded.
+
+        """
+        with self.assertRaises(TypeError):
+            self.assertNotEqual(simple.single, 5)
+
+        self.assertEqual(simple.single._matches, 0)
+        self.assertFalse(simple.single._updates)
+        self.check_updated_files()
+
     def test_nonblank_first_line(self):
         """Verify exception when first line of baseline value is not blank.
 
@@ -591,6 +1154,43 @@ class SpecialCharacters(BaseTestCase):
             special: [(r'"""BACKSLASH [\\]', 'r"""+BACKSLASH [\\]')]})
 
 
+class MultilineRepr(TestCase):
+
+    """Test representation of strings for a triple quoted context."""
+
+    @classmethod
+    def reference(cls, text, special_chars):
+        """Get representation (one special character at a time)."""
+        try:
+            char = special_chars[0]
+        except IndexError:
+            text = ascii(text)[1:-1]
+        else:
+            text = char.join(
+                cls.reference(s, special_chars[1:]) for s in text.split(char))
+        return text
+
+    samples = [
+        '',
+        'plain text',
+        'line 1\nline 2\n',
+        'double ["] single [\'] both ["\']',
+        'backslash [\\] tab [\t] return [\r] null [\x00] delete [\x7f]',
+        'unicode [\xe9] [\u015b] [\U0001f600] surrogate [\ud800]',
+        '\'\'\'\n"""\n\\\n',
+    ]
+
+    def test_matches_reference(self):
+        """Test representation identical to escaping each fragment on its own."""
+        for special_chars in [
+                ('\n', '"'), baseline._baseline.RAW_STRING_SPECIAL_CHARS,
+                ('\n',), ()]:
+            for text in self.samples:
+                self.assertEqual(
+                    baseline._baseline.multiline_repr(text, special_chars),
+                    self.reference(text, special_chars))
+
+
 class WhiteSpace(BaseTestCase):
 
     """Test whitespace supported in baselined strings."""
@@ -0,0 +1,311 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import errno
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from unittest import TestCase
+from unittest.mock import patch
+
+from baseline import _manifest, _shards
+from baseline.__main__ import locate_updates, main, read_manifest
+
+
+class CliTestCase(TestCase):
+
+    """Base class for command line interface test cases.
+
+    Create a directory tree of scripts and baseline update files in a
+    temporary directory and make it the current working directory.
+
+    """
+
+    scripts = [
+        'test_top.py',
+        'pkg/test_one.py',
+        'pkg/test_two.py',
+        'pkg/sub/test_three.py',
+        'other/deeper/still/test_four.py',
+    ]
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+
+        for path in self.scripts:
+            self.write(path, 'OLD')
+            self.write(path + '.update', 'NEW')
+
+        self.write('pkg/untouched.py', 'OLD')
+
+        self.shard_root = tempfile.mkdtemp()
+        environ = patch.dict(os.environ, BASELINE_SHARD_PATH=self.shard_root)
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+        shutil.rmtree(self.shard_root)
+
+    @staticmethod
+    def write(path, content):
+        dirpath = os.path.dirname(path)
+        if dirpath and not os.path.isdir(dirpath):
+            os.makedirs(dirpath)
+        with io.open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+
+    @staticmethod
+    def read(path):
+        with io.open(path, 'r', encoding='utf-8') as handle:
+            return handle.read()
+
+    @contextmanager
+    def quiet(self):
+        with patch('baseline.__main__.print') as print_mock:
+            yield print_mock
+
+
+class LocateUpdates(CliTestCase):
+
+    """Test baseline update files are found."""
+
+    def test_locate(self):
+        """Test update files found in every directory (sorted)."""
+        expect = sorted(os.path.normpath(path) + '.update' for path in self.scripts)
+
+        self.assertEqual(locate_updates(['.']), expect)
+
+    def test_locate_jobs(self):
+        """Test concurrent directory scanning finds same update files."""
+        self.assertEqual(locate_updates(['.'], jobs=4), locate_updates(['.']))
+
+
+
+class PruneDirectories(CliTestCase):
+
+    """Test directories excluded from update file search."""
+
+    pruned = [
+        '.git/hooks/test_git.py',
+        'node_modules/pkg/test_node.py',
+        'env/lib/test_env.py',
+        'generated/test_generated.py',
+        'pkg/skipped/test_skipped.py',
+    ]
+
+    def setUp(self):
+        super(PruneDirectories, self).setUp()
+
+        for path in self.pruned:
+            self.write(path + '.update', 'NEW')
+
+        self.write('env/pyvenv.cfg', '')
+        self.write('.gitignore', '# comment\n\ngenerated/\n/pkg/skip*\n*.update\n')
+
+    def found(self, paths, **kwargs):
+        return sorted(set(locate_updates(['.'], **kwargs)) & set(
+            os.path.normpath(path) + '.update' for path in paths))
+
+    def test_pruned(self):
+        """Test built-in, virtual environment, and .gitignore exclusions."""
+        self.assertEqual(self.found(self.pruned), [])
+        self.assertEqual(
+            self.found(self.scripts), sorted(
+                os.path.normpath(path) + '.update' for path in self.scripts))
+
+    def test_exclude(self):
+        """Test additional directory patterns excluded."""
+        found = self.found(self.scripts, excludes=['sub', 'other/deep*'])
+
+        self.assertEqual(found, ['pkg/test_one.py.update', 'pkg/test_two.py.update',
+                                 'test_top.py.update'])
+
+    def test_no_prune(self):
+        """Test every directory searched when pruning disabled."""
+        found = self.found(self.pruned + self.scripts, prune=False)
+
+        self.assertEqual(len(found), len(self.pruned + self.scripts))
+
+    def test_negation(self):
+        """Test rules of .gitignore file with negated patterns not applied."""
+        self.write('pkg/.gitignore', '/*\n!/sub/\n')
+
+        self.assertEqual(self.found(self.scripts), sorted(
+            os.path.normpath(path) + '.update' for path in self.scripts))
+
+    def test_anchored(self):
+        """Test anchored patterns only match relative to their directory."""
+        self.write('pkg/.gitignore', '/lib\n')
+        pruned = ['build/test_build.py', 'dist/test_dist.py', 'pkg/lib/test_lib.py']
+        kept = ['pkg/build/test_build.py', 'pkg/sub/lib/test_lib.py', 'lib/test_lib.py']
+
+        for path in pruned + kept:
+            self.write(path + '.update', 'NEW')
+
+        self.assertEqual(self.found(pruned), [])
+        self.assertEqual(self.found(kept), sorted(
+            os.path.normpath(path) + '.update' for path in kept))
+        self.assertEqual(
+            locate_updates(['pkg/sub'], excludes=['/lib']),
+            ['pkg/sub/lib/test_lib.py.update', 'pkg/sub/test_three.py.update'])
+
+
+
+class UpdateManifest(CliTestCase):
+
+    """Test update files located with update manifest."""
+
+    def setUp(self):
+        super(UpdateManifest, self).setUp()
+        _manifest.append(
+            self.tmpdir, [path + '.update' for path in self.scripts[:2] + self.scripts[:1]])
+
+    def test_read(self):
+        """Test update files in manifest used (rather than searching)."""
+        self.assertEqual(read_manifest(['.']), (sorted(
+            os.path.normpath(path) + '.update' for path in self.scripts[:2]), []))
+        self.assertEqual(read_manifest(['other']), ([], []))
+
+    def test_stale(self):
+        """Test manifest ignored when an update file no longer exists."""
+        os.remove(self.scripts[0] + '.update')
+
+        self.assertEqual(read_manifest(['.']), ([], ['.']))
+
+    def test_uncovered(self):
+        """Test paths outside of manifest directory searched."""
+        os.chdir('pkg')
+        _manifest.append('.', ['test_one.py.update'])
+
+        self.assertEqual(
+            read_manifest(['.', '../other']), (['test_one.py.update'], ['../other']))
+
+        with self.quiet():
+            self.assertEqual(main(['--force', '--manifest', '.', '../other']), 0)
+
+        os.chdir(self.tmpdir)
+
+        self.assertEqual([self.read(path) for path in self.scripts],
+                         ['OLD', 'NEW', 'OLD', 'OLD', 'NEW'])
+
+    def test_apply(self):
+        """Test only manifest updates applied and manifest removed after."""
+        with self.quiet():
+            self.assertEqual(main(['--force', '--manifest']), 0)
+
+        self.assertEqual([self.read(path) for path in self.scripts],
+                         ['NEW', 'NEW', 'OLD', 'OLD', 'OLD'])
+        self.assertFalse(os.path.exists(_manifest.MANIFEST_NAME))
+
+    def test_scan(self):
+        """Test directories searched despite manifest (unless --manifest)."""
+        # update written by a script run from a subdirectory (recorded in
+        # that directory's manifest)
+        _manifest.append('pkg/sub', ['pkg/sub/test_three.py.update'])
+
+        with self.quiet():
+            self.assertEqual(main(['--force']), 0)
+
+        self.assertEqual([self.read(path) for path in self.scripts], ['NEW'] * 5)
+        self.assertFalse(os.path.exists(_manifest.MANIFEST_NAME))
+
+
+class ApplyUpdates(CliTestCase):
+
+    """Test baseline update files applied."""
+
+    def test_apply_jobs(self):
+        """Test updates applied concurrently and summary is in sorted order."""
+        with self.quiet() as print_mock:
+            self.assertEqual(main(['--force', '--jobs', '3']), 0)
+
+        summary = [call[0][0] for call in print_mock.call_args_list[1:-1]]
+        self.assertEqual(summary, sorted(summary))
+        self.assertEqual(len(summary), len(self.scripts))
+
+        for path in self.scripts:
+            self.assertEqual(self.read(path), 'NEW')
+            self.assertFalse(os.path.exists(path + '.update'))
+
+        self.assertEqual(self.read('pkg/untouched.py'), 'OLD')
+
+    def test_movepath_jobs(self):
+        """Test target directory created concurrently tolerated."""
+        makedirs = os.makedirs
+
+        def racing_makedirs(path, *args, **kwargs):
+            makedirs(path, *args, **kwargs)
+            if not kwargs:
+                # as if another thread created directory first
+                raise OSError(errno.EEXIST, 'File exists', path)
+
+        with self.quiet(), patch('os.makedirs', side_effect=racing_makedirs):
+            self.assertEqual(main(['--force', '--jobs', '3', '--movepath', 'moved']), 0)
+
+        for path in self.scripts:
+            self.assertEqual(self.read(os.path.join('moved', path)), 'NEW')
+            self.assertEqual(self.read(path), 'OLD')
+
+    def test_shards_removed(self):
+        """Test shard files removed along with update file (or orphaned)."""
+        orphan_path = 'gone.py.update'
+
+        with patch.dict(os.environ, {'BASELINE_RUN_ID': 'run1'}):
+            for update_path in (self.scripts[0] + '.update', orphan_path):
+                _shards.write(update_path, update_path[:-7], {1: (0, {'NEW'})})
+
+        # orphan from an earlier run (no longer written to)
+        os.utime(_shards.shard_paths(orphan_path)[0], (0, 0))
+
+        with self.quiet():
+            self.assertEqual(main(['--force', '--clean']), 0)
+
+        self.assertEqual(os.listdir(self.shard_root), [])
+        self.assertEqual(self.read(self.scripts[0]), 'OLD')
+
+    def test_diff(self):
+        """Test differences shown with line numbers of large script."""
+        lines = ['line {}\n'.format(i) for i in range(1, 50001)]
+        shutil.rmtree('other')
+        self.write('other/big.py', ''.join(lines))
+        lines[25000] = 'CHANGED\n'
+        self.write('other/big.py.update', ''.join(lines))
+
+        with self.quiet() as print_mock:
+            with patch('baseline.__main__.input', create=True, return_value='R'):
+                self.assertEqual(main(['--diff', 'other']), 0)
+
+        output = ''.join(
+            ''.join(call[0]) + call[1].get('end', '\n') for call in print_mock.call_args_list)
+        self.assertIn('*** 24998,25004 ****\n', output)
+        self.assertIn('! line 25001\n', output)
+        self.assertIn('--- 24998,25004 ----\n', output)
+        self.assertIn('! CHANGED\n', output)
+        self.assertIn('line 25001\n', self.read('other/big.py'))
@@ -0,0 +1,148 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import difflib
+from unittest import TestCase
+from unittest.mock import patch
+
+from baseline import _diff
+
+LINES = ['line {}\n'.format(i) for i in range(50)]
+
+
+def apply_opcodes(a, b, opcodes):
+    """Build lines from operations (checking they cover both sequences)."""
+    lines = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+        lines += b[j1:j2]
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return lines
+
+
+class ContextDiff(TestCase):
+
+    """Test bounded context differences."""
+
+    def setUp(self):
+        self.changed = list(LINES)
+        self.changed[20] = 'changed\n'
+        self.changed.insert(40, 'inserted\n')
+        del self.changed[5]
+
+    def test_same_as_difflib(self):
+        """Test output matches difflib when differences are unambiguous."""
+        actual = list(_diff.context_diff(LINES, self.changed, 'a', 'b'))
+        expect = list(difflib.context_diff(LINES, self.changed, 'a', 'b'))
+
+        self.assertEqual(actual, expect)
+
+    def test_no_differences(self):
+        """Test no output when lines are the same."""
+        self.assertEqual(list(_diff.context_diff(LINES, list(LINES))), [])
+
+    def test_max_hunks(self):
+        """Test output stops after maximum number of hunks."""
+        actual = list(_diff.context_diff(LINES, self.changed, max_hunks=1))
+        expect = list(difflib.context_diff(LINES, self.changed))[:12]
+
+        self.assertEqual(actual[:12], expect)
+        self.assertEqual(actual[12:], [
+            '***************\n',
+            '*** (further differences not shown) ***\n'])
+
+    def test_max_lines(self):
+        """Test output stops after maximum number of lines (within a hunk)."""
+        a = ['a{}\n'.format(i) for i in range(100)]
+        b = ['b{}\n'.format(i) for i in range(100)]
+
+        actual = list(_diff.context_diff(a, b, max_edits=10, max_lines=10))
+
+        self.assertEqual(actual[:10], list(difflib.context_diff(a, b))[:10])
+        self.assertEqual(actual[10:], [
+            '***************\n',
+            '*** (further differences not shown) ***\n'])
+
+    def test_lazy_groups(self):
+        """Test each group generated before later operations are."""
+        codes = _diff.opcodes(LINES, self.changed)
+        generated = []
+
+        def iter_opcodes(a, b, max_edits):
+            for code in codes:
+                generated.append(code)
+                yield code
+
+        with patch.object(_diff, 'iter_opcodes', iter_opcodes):
+            groups = _diff.grouped_opcodes(LINES, self.changed)
+            first = next(groups)
+            self.assertLess(len(generated), len(codes))
+            self.assertEqual([first] + list(groups), list(
+                difflib.SequenceMatcher(None, LINES, self.changed).get_grouped_opcodes()))
+
+    def test_minimal(self):
+        """Test operations are valid and as few edits as difflib."""
+        sequences = ['abcabba', 'cbabac', '', 'aaa', 'bab', 'abcd', 'dcba']
+
+        for a in sequences:
+            for b in sequences:
+                opcodes = list(_diff._opcodes(a, b, 0, len(a), 0, len(b), 1000))
+                self.assertEqual(''.join(apply_opcodes(a, b, opcodes)), b)
+
+                edits = sum(i2 - i1 + j2 - j1 for tag, i1, i2, j1, j2 in opcodes if tag != 'equal')
+                matcher = difflib.SequenceMatcher(None, a, b)
+                most_edits = sum(
+                    i2 - i1 + j2 - j1 for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+                    if tag != 'equal')
+                self.assertLessEqual(edits, most_edits)
+
+    def test_max_edits(self):
+        """Test differing lines reported as replaced when over edit budget."""
+        a = ['a{}\n'.format(i) for i in range(100)]
+        b = ['b{}\n'.format(i) for i in range(100)]
+
+        groups = list(_diff.grouped_opcodes(a, b, max_edits=10))
+
+        self.assertEqual(groups, [[('replace', 0, 100, 0, 100)]])
+
+    def test_window(self):
+        """Test only lines between identical leading/trailing lines searched."""
+        changed = list(LINES)
+        changed[20] = 'changed\n'
+
+        self.assertEqual(_diff.opcodes(LINES, changed, max_edits=0), [
+            ('equal', 0, 20, 0, 20),
+            ('replace', 20, 21, 20, 21),
+            ('equal', 21, 50, 21, 50)])
+
+    def test_overlap(self):
+        """Test identical leading and trailing lines do not overlap."""
+        self.assertEqual(_diff.opcodes(['a', 'a'], ['a', 'a', 'a']), [
+            ('equal', 0, 2, 0, 2),
+            ('insert', 2, 2, 2, 3)])
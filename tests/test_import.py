@@ -0,0 +1,66 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import subprocess
+import sys
+from unittest import TestCase, skipIf
+
+from . import top_dir
+
+# modules only needed once a comparison mismatches (or to transform strings)
+DEFERRED_MODULES = (
+    'difflib', 'hashlib', 'inspect', 'json', 'multiprocessing', 're',
+    'tempfile', 'threading', 'tokenize', 'warnings',
+    'baseline._diff', 'baseline._literals', 'baseline._shards',
+    'baseline._stats', 'baseline._transforms', 'baseline._updates',
+)
+
+
+class ImportTime(TestCase):
+
+    """Test import of baseline package defers heavyweight modules."""
+
+    @skipIf(sys.version_info < (3, 7), '-X importtime not supported')
+    def test_deferred(self):
+        """Test modules not imported (as reported by ``-X importtime``)."""
+        env = dict(os.environ, PYTHONPATH=top_dir)
+        for name in ('BASELINE_STATS', 'BASELINE_MEMORY_REPORT', 'PYTHONTRACEMALLOC'):
+            env.pop(name, None)
+
+        process = subprocess.Popen(
+            [sys.executable, '-X', 'importtime', '-c', 'import baseline'],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stderr = process.communicate()[1].decode('utf-8')
+
+        self.assertEqual(process.returncode, 0, stderr)
+
+        # line format: "import time: self [us] | cumulative | imported package"
+        imported = set(
+            line.split('|')[-1].strip() for line in stderr.splitlines()
+            if line.startswith('import time:'))
+
+        self.assertIn('baseline._baseline', imported)
+        self.assertEqual(sorted(imported.intersection(DEFERRED_MODULES)), [])
@@ -0,0 +1,501 @@
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Copyright 2020 Daniel Mark Gass
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import errno
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from baseline import _script, _shards
+from baseline._literals import LiteralIndex
+from baseline._script import Script
+
+from . import top_dir
+
+# suppress file writes
+Script.TEST_MODE = True
+
+SOURCE = '\n'.join([
+    'from baseline import Baseline',
+    '',
+    '# comment with """ delimiter',
+    '',
+    'first = Baseline("""FIRST""")',
+    '',
+    'second = Baseline(',
+    '    r"""',
+    '    SECOND \\',
+    '    """)',
+    '',
+    "third = dict(text=Baseline('''THIRD'''), note='not a \"\"\"baseline\"\"\"')",
+    '',
+])
+
+
+class ScriptTestCase(TestCase):
+
+    """Base class for test cases using a temporary script."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'script.py')
+        with io.open(self.path, 'w', encoding='utf-8') as handle:
+            handle.write(SOURCE)
+
+        # shard files of this process and of scripts run in subprocesses
+        self.shard_root = tempfile.mkdtemp()
+        environ = patch.dict(os.environ, BASELINE_SHARD_PATH=self.shard_root)
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        shutil.rmtree(self.shard_root)
+
+    @staticmethod
+    def linenum(text):
+        """Get line number of baseline as reported by the interpreter.
+
+        :param str text: text on first line of statement
+        :returns: line number of first line of statement (Python 3.8 or
+            later) or last line of statement (earlier versions)
+        :rtype: int
+
+        """
+        lines = SOURCE.split('\n')
+        linenum = next(i for i, line in enumerate(lines, 1) if text in line)
+        if sys.version_info < (3, 8):
+            def delimiters(linenum):
+                return lines[linenum - 1].count('"""') + lines[linenum - 1].count("'''")
+
+            # advance to line opening the literal and then to the line closing it
+            while not delimiters(linenum):
+                linenum += 1
+            if delimiters(linenum) == 1:
+                linenum += 1
+                while not delimiters(linenum):
+                    linenum += 1
+        return linenum
+
+
+class ReplaceBaselineRepr(ScriptTestCase):
+
+    """Test baseline representations located and replaced."""
+
+    def test_many_updates(self):
+        """Test every registered update applied in a single pass."""
+        script = Script(self.path)
+        script.add_update(self.linenum('first ='), '"""FIRST+"""')
+        script.add_update(self.linenum('second ='), '"""\n    SECOND+\n    """')
+        script.add_update(self.linenum('third ='), '"""THIRD+"""')
+        script.update()
+
+        expect = SOURCE.replace(
+            '"""FIRST"""', '"""FIRST+"""').replace(
+            'r"""\n    SECOND \\\n', '"""\n    SECOND+\n').replace(
+            "'''THIRD'''", '"""THIRD+"""')
+
+        self.assertEqual('\n'.join(script.lines), expect)
+
+    def test_line_count_changes(self):
+        """Test updates adding and removing lines keep following lines intact."""
+        script = Script(self.path)
+        script.add_update(self.linenum('first ='), '"""\nFIRST\n+\n"""')
+        script.add_update(self.linenum('second ='), '"""SECOND+"""')
+        script.add_update(self.linenum('third ='), '"""\n    THIRD+\n    """')
+        script.update()
+
+        expect = SOURCE.replace(
+            '"""FIRST"""', '"""\nFIRST\n+\n"""').replace(
+            'r"""\n    SECOND \\\n    """', '"""SECOND+"""').replace(
+            "'''THIRD'''", '"""\n    THIRD+\n    """')
+
+        self.assertEqual('\n'.join(script.lines), expect)
+
+    def test_single_update(self):
+        """Test individual baseline representation replaced."""
+        script = Script(self.path)
+        script.replace_baseline_repr(self.linenum('third ='), '"""THIRD+"""')
+
+        self.assertEqual(
+            '\n'.join(script.lines), SOURCE.replace("'''THIRD'''", '"""THIRD+"""'))
+
+    def test_not_found(self):
+        """Test exception raised when baseline representation not found."""
+        script = Script(self.path)
+        linenum = 1 if sys.version_info < (3, 8) else len(SOURCE.split('\n'))
+
+        with self.assertRaises(RuntimeError):
+            script.replace_baseline_repr(linenum, '"""NOT FOUND"""')
+
+
+class Literals(ScriptTestCase):
+
+    """Test index of triple quoted string literals."""
+
+    def test_spans(self):
+        """Test location, prefix, and quote style of each literal."""
+        index = LiteralIndex(SOURCE)
+
+        self.assertEqual(
+            [(span.start_linenum, span.end_linenum, span.prefix, span.quotes)
+             for span in index.spans],
+            [(5, 5, '', '"""'), (8, 10, 'r', '"""'), (12, 12, '', "'''")])
+
+        for span in index.spans:
+            self.assertEqual(SOURCE[span.start:span.end][len(span.prefix):][:3], span.quotes)
+
+    def test_lookup(self):
+        """Test literals located relative to a line number."""
+        index = LiteralIndex(SOURCE)
+        first, second, third = index.spans
+
+        self.assertIs(index.first_starting_at(1), first)
+        self.assertIs(index.first_starting_at(5), first)
+        self.assertIs(index.first_starting_at(6), second)
+        self.assertIs(index.first_starting_at(13), None)
+
+        self.assertIs(index.last_ending_at(4), None)
+        self.assertIs(index.last_ending_at(9), first)
+        self.assertIs(index.last_ending_at(10), second)
+        self.assertIs(index.last_ending_at(100), third)
+
+    def test_cache(self):
+        """Test index reused until file changes."""
+        script = Script(self.path)
+        index = script.literals
+
+        self.assertIs(Script(self.path).literals, index)
+
+        with io.open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write('fourth = """FOURTH"""\n')
+
+        changed = Script(self.path).literals
+
+        self.assertIsNot(changed, index)
+        self.assertEqual(len(changed.spans), 4)
+
+
+class SourceCache(ScriptTestCase):
+
+    """Test source file lines shared by Script instances."""
+
+    def test_reused(self):
+        """Test unchanged file not read again."""
+        self.assertEqual(Script(self.path).lines, SOURCE.split('\n'))
+
+        with patch('baseline._script.io.open') as open_mock:
+            self.assertEqual(Script(self.path).lines, SOURCE.split('\n'))
+
+        open_mock.assert_not_called()
+
+    def test_updates_isolated(self):
+        """Test replacing baselines leaves cached lines intact."""
+        script = Script(self.path)
+        script.add_update(self.linenum('first ='), '"""FIRST+"""')
+        script.update()
+
+        self.assertEqual(Script(self.path).lines, SOURCE.split('\n'))
+
+    def test_changed(self):
+        """Test file read again when modified."""
+        Script(self.path).lines
+
+        with io.open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write('# appended')
+
+        self.assertEqual(Script(self.path).lines[-1], '# appended')
+
+    def test_invalidate(self):
+        """Test explicit invalidation when modification key is unchanged."""
+        Script(self.path).literals
+        stat_key = LiteralIndex.stat_key(self.path)
+
+        with io.open(self.path, 'w', encoding='utf-8') as handle:
+            handle.write(SOURCE.replace('FIRST', 'FIRS1'))
+
+        with patch.object(LiteralIndex, 'stat_key', return_value=stat_key):
+            self.assertIn('first = Baseline("""FIRST""")', Script(self.path).lines)
+
+            _script.invalidate(self.path)
+
+            self.assertNotIn(self.path, LiteralIndex._cache)
+            self.assertIn('first = Baseline("""FIRS1""")', Script(self.path).lines)
+
+
+class WriteUpdate(ScriptTestCase):
+
+    """Test update files written atomically."""
+
+    def setUp(self):
+        super(WriteUpdate, self).setUp()
+        Script.TEST_MODE = False
+        os.chmod(self.path, 0o750)
+
+    def tearDown(self):
+        Script.TEST_MODE = True
+        super(WriteUpdate, self).tearDown()
+
+    def update(self):
+        script = Script(self.path)
+        script.WRITE_CHUNK_LINES = 2
+        script.add_update(self.linenum('first ='), '"""FIRST+"""')
+        return script.update(report=False)
+
+    def test_write(self):
+        """Test update file content and permissions."""
+        update_filepath = self.update()
+
+        self.assertEqual(update_filepath, self.path + '.update')
+        with io.open(update_filepath, 'r', encoding='utf-8') as handle:
+            self.assertEqual(handle.read(), SOURCE.replace('FIRST', 'FIRST+'))
+        self.assertEqual(os.stat(update_filepath).st_mode & 0o777, 0o750)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['script.py', 'script.py.update'])
+
+    def test_interrupted(self):
+        """Test neither update file nor temporary file left when write fails."""
+        with patch.object(_script, '_replace', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.update()
+
+        self.assertEqual(os.listdir(self.tmpdir), ['script.py'])
+
+    def test_makedirs(self):
+        """Test directory created concurrently tolerated (other errors raised)."""
+        dirpath = os.path.join(self.tmpdir, 'new', 'dir')
+        makedirs = os.makedirs
+
+        def racing_makedirs(path, *args, **kwargs):
+            makedirs(path, *args, **kwargs)
+            if not kwargs:
+                # as if another thread created directory first
+                raise OSError(errno.EEXIST, 'File exists', path)
+
+        with patch('os.makedirs', side_effect=racing_makedirs):
+            _script.makedirs(dirpath)
+
+        self.assertTrue(os.path.isdir(dirpath))
+
+        error = OSError(errno.EACCES, 'Permission denied')
+        with patch('os.makedirs', side_effect=error):
+            with self.assertRaises(OSError):
+                _script.makedirs(os.path.join(self.tmpdir, 'denied'))
+
+
+class ShardedUpdates(ScriptTestCase):
+
+    """Test updates from multiple processes merged."""
+
+    WORKER_SCRIPT = '\n'.join([
+        'import sys',
+        'from baseline import Baseline',
+        'expected = Baseline("""X""")',
+        'assert expected != sys.argv[1]',
+        '',
+    ])
+
+    def test_shards(self):
+        """Test shard from this process merged with shards of same run."""
+        update_filepath = self.path + '.update'
+        environ = {'BASELINE_RUN_ID': 'run1', 'PYTEST_XDIST_WORKER': 'gw0'}
+
+        with patch.dict(os.environ, environ):
+            _shards.write(update_filepath, self.path, {5: (0, {'A'})})
+            _shards.write(update_filepath, self.path, {5: (0, {'B'}), 8: (4, {'C'})})
+
+        with patch.dict(os.environ, dict(environ, PYTEST_XDIST_WORKER='gw1')):
+            _shards.write(update_filepath, self.path, {5: (0, {'D'})}, updated=False)
+            merged = _shards.read_run(update_filepath)
+
+        self.assertEqual(merged, ({5: (0, {'A', 'B', 'D'}), 8: (4, {'C'})}, True))
+
+        with patch.dict(os.environ, dict(environ, BASELINE_RUN_ID='run2')):
+            _shards.write(update_filepath, self.path, {5: (0, {'E'})}, updated=False)
+            merged = _shards.read_run(update_filepath)
+
+        self.assertEqual(merged, ({5: (0, {'E'})}, False))
+        self.assertEqual(len(_shards.shard_paths(update_filepath)), 1)
+        self.assertEqual(os.listdir(self.tmpdir), ['script.py'])
+        self.assertEqual(os.listdir(self.shard_root), ['run2'])
+
+        _shards.remove(update_filepath)
+
+        self.assertEqual(os.listdir(self.shard_root), [])
+
+    def test_orphans(self):
+        """Test shards removed once old and update file no longer exists."""
+        update_filepath = self.path + '.update'
+        orphan_filepath = os.path.join(self.tmpdir, 'gone.py.update')
+
+        with patch.dict(os.environ, {'BASELINE_RUN_ID': 'run1'}):
+            _shards.write(update_filepath, self.path, {5: (0, {'A'})})
+            _shards.write(orphan_filepath, self.path, {5: (0, {'A'})})
+        with io.open(update_filepath, 'w', encoding='utf-8') as handle:
+            handle.write('')
+
+        _shards.remove_orphans()
+        self.assertEqual(len(os.listdir(os.path.join(self.shard_root, 'run1'))), 2)
+
+        _shards.remove_orphans(min_age=-1)
+        self.assertEqual(_shards.shard_paths(orphan_filepath), [])
+        self.assertEqual(len(_shards.shard_paths(update_filepath)), 1)
+
+    def test_run_id(self):
+        """Test processes started from the same parent are separate runs."""
+        env = dict(os.environ, PYTHONPATH=top_dir)
+        env.pop('BASELINE_RUN_ID', None)
+        env.pop('PYTEST_XDIST_TESTRUNUID', None)
+
+        command = [sys.executable, '-c', 'from baseline import _shards; '
+                   'print(_shards.run_id() == _shards.run_id(), _shards.run_id())']
+
+        first, second = (
+            subprocess.check_output(command, env=env).decode().split() for _ in range(2))
+
+        self.assertEqual(first[0], 'True')
+        self.assertNotEqual(first[1], second[1])
+
+    def test_workers(self):
+        """Test update file includes strings compared by every process."""
+        with io.open(self.path, 'w', encoding='utf-8') as handle:
+            handle.write(self.WORKER_SCRIPT)
+
+        env = dict(os.environ, PYTHONPATH=top_dir, BASELINE_RUN_ID='run1',
+                   BASELINE_SHARD_UPDATES='YES')
+        env.pop('BASELINE_MOVE_UPDATES', None)
+
+        workers = []
+        for worker in ('a', 'b', 'c'):
+            env['PYTEST_XDIST_WORKER'] = 'gw' + worker
+            workers.append(subprocess.Popen(
+                [sys.executable, self.path, worker], cwd=self.tmpdir, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE))
+        for process in workers:
+            process.communicate()
+
+        with io.open(self.path + '.update', 'r', encoding='utf-8') as handle:
+            content = handle.read()
+
+        for worker in ('a', 'b', 'c'):
+            self.assertIn('\n{}\n'.format(worker), content)
+        self.assertIn('# Baseline Alternative 3', content)
+
+    def test_matching_workers(self):
+        """Test strings of matching workers kept only when run has a mismatch."""
+        with io.open(self.path, 'w', encoding='utf-8') as handle:
+            handle.write(self.WORKER_SCRIPT.replace('assert expected != ', 'expected == '))
+
+        update_filepath = self.path + '.update'
+
+        def run(run_id, *strings):
+            env = dict(os.environ, PYTHONPATH=top_dir, BASELINE_RUN_ID=run_id,
+                       BASELINE_SHARD_UPDATES='YES')
+            env.pop('BASELINE_MOVE_UPDATES', None)
+
+            for worker, string in enumerate(strings):
+                env['PYTEST_XDIST_WORKER'] = 'gw{}'.format(worker)
+                subprocess.check_call(
+                    [sys.executable, self.path, string], cwd=self.tmpdir, env=env,
+                    stdout=subprocess.PIPE)
+
+        run('run1', 'X', 'X')
+        self.assertFalse(os.path.exists(update_filepath))
+        self.assertEqual(os.listdir(self.shard_root), [])
+
+        # matching worker after worker with a mismatch
+        run('run2', 'b', 'X')
+
+        with io.open(update_filepath, 'r', encoding='utf-8') as handle:
+            content = handle.read()
+
+        self.assertIn('\nb\n', content)
+        self.assertIn('\nX\n', content)
+        self.assertIn('# Baseline Alternative 2', content)
+        self.assertFalse([name for name in os.listdir(self.tmpdir) if 'shard' in name])
+        self.assertEqual(len(os.listdir(os.path.join(self.shard_root, 'run2'))), 2)
+
+
+class FlushUpdates(ScriptTestCase):
+
+    """Test updates written before interpreter exit."""
+
+    FLUSH_SCRIPT = '\n'.join([
+        'import os',
+        'from baseline import Baseline',
+        'expected = Baseline("""X""")',
+        'assert expected != "first"',
+        'Baseline.flush()',
+        'assert not expected._updates',
+        'assert os.path.exists(__file__ + ".update")',
+        'assert expected != "second"',
+        '',
+    ])
+
+    THRESHOLD_SCRIPT = '\n'.join([
+        'import os',
+        'from baseline import Baseline',
+        'expected = Baseline("""X""")',
+        'assert expected != "first"',
+        'assert not expected._updates',
+        'with open(__file__ + ".update") as handle:',
+        '    assert "first" in handle.read()',
+        '',
+    ])
+
+    def run_script(self, content, **environ):
+        with io.open(self.path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+
+        env = dict(os.environ, PYTHONPATH=top_dir, **environ)
+        env.pop('BASELINE_MOVE_UPDATES', None)
+        env.pop('BASELINE_SHARD_UPDATES', None)
+        env.pop('PYTEST_XDIST_WORKER', None)
+
+        process = subprocess.Popen(
+            [sys.executable, self.path], cwd=self.tmpdir, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stderr = process.communicate()[1]
+        self.assertEqual(process.returncode, 0, stderr)
+
+        with io.open(self.path + '.update', 'r', encoding='utf-8') as handle:
+            return handle.read()
+
+    def test_flush(self):
+        """Test update file at exit includes strings released by flush."""
+        content = self.run_script(self.FLUSH_SCRIPT)
+
+        self.assertIn('\nfirst\n', content)
+        self.assertIn('\nsecond\n', content)
+        self.assertEqual(_shards.shard_paths(self.path + '.update'), [])
+
+    def test_threshold(self):
+        """Test flush once number of recorded strings reaches threshold."""
+        content = self.run_script(self.THRESHOLD_SCRIPT, BASELINE_FLUSH_THRESHOLD='1')
+
+        self.assertIn('"""first"""', content)